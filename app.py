@@ -1,79 +1,40 @@
 # app.py
 
 import os
+import sys
+import threading
 from functools import wraps
 
-from dotenv import load_dotenv
-from flask import Flask, render_template, abort
-from flask_login import LoginManager, login_required, current_user
-from flask_migrate import Migrate
-from flask_cors import CORS
+from flask import Flask, abort, render_template
+from flask_login import current_user, login_required
+from werkzeug.utils import import_string
 
+from config import Config
 from database.engine import db
-from database.models.user import User
-from database.models.servicePrice import ServicePrice
-
-# Импортируем блюпринты
-from routes.users_routes.index import index_route
-from routes.users_routes.login import user_bp
-from routes.users_routes.auth_register import register_bp# или как ты назвал
-from routes.admin_routes.dashboard import admin_bp
-from routes.admin_routes.requests import admin_required_bp
-from routes.admin_routes.queue import queue_bp
-from routes.admin_routes.service import service_bp
-from routes.admin_routes.price import price_bp
-from routes.admin_routes.admin_discounts import admin_discounts_bp
-from routes.admin_routes.visit import visit_bp
-from mobile_routes.mob_db import mob_db
-
-load_dotenv()
-
-# Создаём приложение
-app = Flask(__name__, static_url_path="/service/static", static_folder="static")
-CORS(app)
-
-# Конфигурация
-app.config['SECRET_KEY'] = 'ilya'  # ОБЯЗАТЕЛЬНО смени в продакшене!
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL")
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_recycle': 300,
-    'pool_pre_ping': True
-}
-
-# Инициализация расширений
-db.init_app(app)
-migrate = Migrate(app, db)
-
-login_manager = LoginManager(app)
-login_manager.login_view = 'user_bp.login'  # важно: имя_блюпринта.имя_функции
-
-@login_manager.user_loader
-def load_user(user_id):
-    return db.session.get(User, int(user_id))
-
-# Регистрация блюпринтов (ТОЛЬКО ПОСЛЕ создания app!)
+
+# Блюпринты импортируются только при сборке веб-приложения: скриптам и
+# командам, которым нужна одна БД, не приходится грузить весь веб-стек
 
 # Сначала мобильный API (без префикса, если нужно)
-app.register_blueprint(mob_db)
+ROOT_BLUEPRINTS = [
+    'mobile_routes.mob_db:mob_db',
+    'routes.health:health_bp',      # /healthz, /readyz, /metrics
+]
 
 # Затем основные маршруты с префиксом /service
-blueprints = [
-    index_route,
-    user_bp,              # login + logout
-    register_bp,     # регистрация — убедись, что имя импорта правильное!
-    admin_bp,
-    admin_required_bp,
-    queue_bp,
-    service_bp,
-    price_bp,
-    admin_discounts_bp,
-    visit_bp,
+BLUEPRINTS = [
+    'routes.users_routes.index:index_route',
+    'routes.users_routes.login:user_bp',              # login + logout
+    'routes.users_routes.auth_register:register_bp',  # регистрация
+    'routes.admin_routes.dashboard:admin_bp',
+    'routes.admin_routes.requests:admin_required_bp',
+    'routes.admin_routes.queue:queue_bp',
+    'routes.admin_routes.service:service_bp',
+    'routes.admin_routes.price:price_bp',
+    'routes.admin_routes.admin_discounts:admin_discounts_bp',
+    'routes.admin_routes.visit:visit_bp',
 ]
 
-for bp in blueprints:
-    app.register_blueprint(bp, url_prefix="/service")
-
 # Декоратор админа
 def admin_required(f):
     @wraps(f)
@@ -83,11 +44,6 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Настройка загрузки файлов
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-app.config['ALLOWED_EXTENSIONS'] = {'xls', 'xlsx', 'csv'}
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
-
 # Создание папок
 def create_upload_folders():
     folders = [
@@ -96,21 +52,157 @@ def create_upload_folders():
     ]
     for folder in folders:
         os.makedirs(folder, exist_ok=True)
-        print(f"Папка создана: {folder}")
-
-create_upload_folders()
-
-# Обычные маршруты
-@app.route('/account')
-@login_required
-def account():
-    return render_template('account.html', user=current_user)
 
-@app.route('/service-prices')
-def get_service_prices():
-    active_prices = ServicePrice.query.filter_by(is_active=True).order_by(ServicePrice.service_name).all()
-    return render_template('price.html', prices=active_prices)
 
-# Запуск
+def create_base_app(config=None):
+    """Приложение только с настройками и БД — для скриптов (create_admin.py и т.п.).
+    config — класс/объект с настройками или словарь поверх Config."""
+    app = Flask(__name__, static_url_path="/service/static", static_folder="static")
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    # Пул PostgreSQL с учётом ожидания свободного соединения (метрика db_pool_wait_seconds)
+    if (app.config.get('SQLALCHEMY_DATABASE_URI') or '').startswith('postgresql'):
+        from database.pool import TimedQueuePool
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'poolclass': TimedQueuePool, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        }
+
+    db.init_app(app)
+    return app
+
+
+def init_extensions(app):
+    from flask_cors import CORS
+    from flask_login import LoginManager
+
+    from database.models.user import User
+    from utils.cache_generation import generations
+    from utils.discount_cache import discount_cache
+    from utils.estimate_preview import estimate_previews
+    from utils.file_delivery import file_delivery
+    from utils.metrics import metrics
+    from utils.page_cache import page_cache
+    from utils.sql_stats import sql_stats
+    from utils.upload_stream import upload_stream
+    from utils.visit_buffer import visit_buffer
+    from utils.visit_policy import visit_policy
+
+    CORS(app)
+
+    if app.config['MIGRATIONS_ENABLED']:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    login_manager = LoginManager(app)
+    login_manager.login_view = 'user_bp.login'  # важно: имя_блюпринта.имя_функции
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    visit_buffer.init_app(app)
+    visit_policy.init_app(app)
+    page_cache.init_app(app)
+    generations.init_app(app)
+    discount_cache.init_app(app)
+    sql_stats.init_app(app)
+    metrics.init_app(app)
+    file_delivery.init_app(app)
+    estimate_previews.init_app(app)
+    upload_stream.init_app(app)
+
+
+def register_blueprints(app):
+    for path in ROOT_BLUEPRINTS:
+        app.register_blueprint(import_string(path))
+    for path in BLUEPRINTS:
+        app.register_blueprint(import_string(path), url_prefix="/service")
+
+
+class LazyBlueprints:
+    """WSGI-обёртка: блюпринты импортируются и регистрируются при первом запросе или вызове load().
+    Командам flask (db upgrade, visit-rollup и т.п.) веб-стек не нужен — он и не грузится"""
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.loaded = False
+        self._lock = threading.Lock()
+        app.wsgi_app = self
+        app.extensions['lazy_blueprints'] = self
+
+    def load(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if not self.loaded:
+                register_blueprints(self.app)
+                self.loaded = True
+
+    def __call__(self, environ, start_response):
+        self.load()
+        return self.wsgi_app(environ, start_response)
+
+
+def load_blueprints(app):
+    """Регистрирует блюпринты сразу (веб-сервер: в мастере gunicorn до fork — воркеры делят их copy-on-write)"""
+    app.extensions['lazy_blueprints'].load()
+
+
+def create_app(config=None):
+    """Создаёт и настраивает веб-приложение (для gunicorn — через wsgi.py)"""
+    app = create_base_app(config)
+    init_extensions(app)
+    LazyBlueprints(app)
+    create_upload_folders()
+
+    # За обратным прокси адрес клиента — из X-Forwarded-For, а не адрес прокси
+    hops = int(app.config.get('PROXY_FIX_X_FOR', 0))
+    if hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    # Служебные команды flask (visit-rollup и др.)
+    from cli import register_commands
+    register_commands(app)
+
+    if app.config['SCHEDULER_ENABLED']:
+        from utils.scheduler import init_scheduler
+        init_scheduler(app)
+
+    # Обычные маршруты
+    from utils.price_cache import price_list_cache
+
+    @app.route('/account')
+    @login_required
+    def account():
+        return render_template('account.html', user=current_user)
+
+    @app.route('/service-prices')
+    def get_service_prices():
+        return price_list_cache.response()
+
+    return app
+
+
+# Запуск: python app.py — боевой режим (gunicorn, настройки в gunicorn.conf.py),
+# python app.py --dev — отладочный сервер Werkzeug с автоперезагрузкой,
+# python app.py --profile-import — сколько времени уходит на импорт каждого модуля при старте
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
+    if '--profile-import' in sys.argv[1:]:
+        from utils.import_profile import print_report
+        print_report('import wsgi')
+    elif '--dev' in sys.argv[1:]:
+        create_app({'SCHEDULER_ENABLED': True}).run(host='0.0.0.0', port=8000, debug=True)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        os.execvp(sys.executable, [
+            sys.executable, '-m', 'gunicorn',
+            '--chdir', base_dir,
+            '-c', os.path.join(base_dir, 'gunicorn.conf.py'),
+            'wsgi:app',
+        ])
@@ -0,0 +1,119 @@
+# cli.py — служебные команды `flask ...`
+
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+
+
+def register_commands(app):
+    app.cli.add_command(visit_rollup_command)
+    app.cli.add_command(visit_partitions_command)
+    app.cli.add_command(db_audit_command)
+    app.cli.add_command(uploads_gc_command)
+    app.cli.add_command(estimate_previews_command)
+    app.cli.add_command(scheduler_command)
+
+
+@click.command('visit-rollup')
+@with_appcontext
+@click.option('--since', default=None, help='Пересчитать начиная с даты YYYY-MM-DD (по умолчанию — всё)')
+def visit_rollup_command(since):
+    """Пересчитывает таблицу visit_daily_rollup из сырых визитов."""
+    from utils.visit_rollup import rebuild_rollup
+
+    since_date = datetime.strptime(since, '%Y-%m-%d').date() if since else None
+    days = rebuild_rollup(since_date)
+    click.echo(f"Пересчитано дней: {days}")
+
+
+@click.command('visit-partitions')
+@click.option('--ahead', type=int, default=None, help='Сколько месяцев вперёд создать секции')
+@click.option('--retention', type=int, default=None, help='Сколько месяцев хранить (0 — не удалять)')
+@click.option('--archive/--drop', default=None, help='Старые секции перенести в схему visit_archive или удалить')
+@with_appcontext
+def visit_partitions_command(ahead, retention, archive):
+    """Обслуживание месячных секций таблицы visit."""
+    from utils.visit_partitions import maintain_visit_partitions
+
+    report = maintain_visit_partitions(ahead, retention, archive)
+    for key, title in (('created', 'Созданы'), ('removed', 'Убраны'), ('skipped', 'Отложены')):
+        click.echo(f"{title}: {', '.join(report[key]) or '—'}")
+
+
+@click.command('db-audit')
+@click.option('--seed', 'rows', type=int, default=20000, show_default=True,
+              help='Сколько синтетических заказов добавить перед проверкой (0 — только текущие данные); всё откатывается')
+@with_appcontext
+def db_audit_command(rows):
+    """EXPLAIN (ANALYZE, BUFFERS) запросов страниц админки и сайта: ищет последовательные сканирования."""
+    from utils.db_audit import run_audit
+
+    report = run_audit(rows)
+    flagged = 0
+    for item in report:
+        unexpected = item['seq_scans'] and not item['full_scan_ok']
+        flagged += bool(unexpected)
+        mark = 'SEQ SCAN' if unexpected else 'ok'
+        click.echo(f"[{mark:>8}] {item['name']}: {item['time_ms']:.2f} мс, "
+                   f"буферы hit={item['shared_hit']} read={item['shared_read']}")
+        click.echo(f"           {'; '.join(item['nodes']) or '—'}")
+    click.echo(f"Запросов: {len(report)}, с неожиданным Seq Scan: {flagged}")
+    if flagged:
+        raise SystemExit(1)
+
+
+@click.command('uploads-gc')
+@click.option('--grace-hours', type=float, default=None, help='Не трогать файлы моложе стольких часов')
+@click.option('--quarantine-days', type=float, default=None, help='Сколько дней файл лежит в карантине до удаления')
+@click.option('--dry-run', is_flag=True, help='Только показать, что было бы сделано')
+@with_appcontext
+def uploads_gc_command(grace_hours, quarantine_days, dry_run):
+    """Убирает файлы загрузок, на которые не ссылается БД (сметы и картинки скидок)."""
+    from utils.upload_gc import collect_garbage
+
+    report = collect_garbage(grace_hours, quarantine_days, dry_run)
+    click.echo(f"Просмотрено файлов: {report['scanned']}, без ссылок: {report['orphans']}")
+    click.echo(f"В карантин: {report['quarantined']} ({report['quarantined_bytes']} байт), "
+               f"возвращено: {report['restored']}")
+    click.echo(f"Удалено из карантина: {report['deleted']}, освобождено байт: {report['reclaimed_bytes']}")
+
+
+@click.command('estimate-previews')
+@click.option('--all', 'rebuild', is_flag=True, help='Разобрать заново и уже разобранные сметы')
+@with_appcontext
+def estimate_previews_command(rebuild):
+    """Разбирает сметы без превью (например, загруженные до появления превью)
+    и заново — те, чей формат раньше не определился (файлы без расширения)."""
+    from sqlalchemy import null, select, update
+
+    from database.engine import db
+    from database.models.stored_file import StoredFile
+    from utils.estimate_preview import UNSUPPORTED, estimate_previews
+
+    # null() — SQL NULL: None в колонке JSON записался бы как JSON 'null'
+    query = update(StoredFile).values(preview=null())
+    if not rebuild:
+        query = query.where(StoredFile.preview['error'].as_string().endswith(UNSUPPORTED))
+    db.session.execute(query)
+    db.session.commit()
+    paths = db.session.execute(select(StoredFile.path).where(StoredFile.preview.is_(None))).scalars().all()
+    failed = 0
+    for path in paths:
+        preview = estimate_previews.process(path)
+        failed += bool(preview and preview.get('error'))
+    click.echo(f"Разобрано смет: {len(paths)}, с ошибками: {failed}")
+
+
+@click.command('scheduler')
+@with_appcontext
+def scheduler_command():
+    """Выполняет фоновые задачи (очистка скидок, секции visit, сборка мусора в загрузках) до остановки.
+
+    Запускается отдельным процессом рядом с gunicorn — в веб-процессах задачи не работают."""
+    from flask import current_app
+
+    from utils.scheduler import run_scheduler
+
+    click.echo("Планировщик фоновых задач запущен")
+    run_scheduler(current_app._get_current_object())
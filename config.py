@@ -0,0 +1,105 @@
+# config.py — настройки приложения. Значения по умолчанию переопределяются переменными окружения
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def env_list(name, default=''):
+    """Список через запятую из переменной окружения"""
+    return [e for e in os.getenv(name, default).split(',') if e]
+
+
+class Config:
+    SECRET_KEY = 'ilya'  # ОБЯЗАТЕЛЬНО смени в продакшене!
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_recycle': 300,
+        'pool_pre_ping': True
+    }
+
+    # Буфер визитов: запись в БД пачками из фонового потока
+    VISIT_FLUSH_INTERVAL = float(os.getenv('VISIT_FLUSH_INTERVAL', '5'))
+    VISIT_FLUSH_SIZE = int(os.getenv('VISIT_FLUSH_SIZE', '500'))
+
+    # Какие запросы считать визитами: списки эндпоинтов/блюпринтов через запятую
+    VISIT_TRACK_ALLOW = env_list('VISIT_TRACK_ALLOW')
+    VISIT_TRACK_DENY = env_list('VISIT_TRACK_DENY', 'static,mobile,health')
+
+    # Кэш готовых публичных страниц для анонимных посетителей
+    PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', '300'))
+    PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+    # Как часто процесс сверяет поколения кэшей (прайс и т.п.) с БД, секунды
+    CACHE_GENERATION_CHECK_INTERVAL = float(os.getenv('CACHE_GENERATION_CHECK_INTERVAL', '2'))
+
+    # Снимок действующих скидок живёт до ближайшего окончания скидки, но не дольше, секунды
+    DISCOUNT_CACHE_MAX_TTL = float(os.getenv('DISCOUNT_CACHE_MAX_TTL', '600'))
+
+    # Очередь в админке по умолчанию показывает сегодня ± столько дней
+    QUEUE_WINDOW_DAYS = int(os.getenv('QUEUE_WINDOW_DAYS', '7'))
+
+    # Сколько последних комментариев показывать у каждой строки на досках админки
+    COMMENTS_PER_ROW = int(os.getenv('COMMENTS_PER_ROW', '3'))
+
+    # Учёт SQL по запросам: заголовки X-DB-* (в debug и для админов) и предупреждения в лог
+    SQL_STATS_ENABLED = os.getenv('SQL_STATS_ENABLED', '1') == '1'
+    SQL_STATS_HEADERS = os.getenv('SQL_STATS_HEADERS', '1') == '1'
+    SQL_SLOW_REQUEST_QUERIES = int(os.getenv('SQL_SLOW_REQUEST_QUERIES', '30'))
+    SQL_SLOW_REQUEST_MS = float(os.getenv('SQL_SLOW_REQUEST_MS', '500'))
+    # Один и тот же SQL столько раз за запрос — вероятный N+1
+    SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', '5'))
+
+    # Сколько обратных прокси (nginx и т.п.) стоит перед приложением. 0 — запросы приходят напрямую;
+    # иначе адрес клиента берётся из X-Forwarded-For (ProxyFix), а не адрес самого прокси. Без этого за
+    # nginx все клиенты (визиты, METRICS_ALLOWED_IPS) выглядят как 127.0.0.1
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', '0'))
+
+    # Метрики (/metrics): админам, по заголовку Authorization: Bearer METRICS_TOKEN (bearer_token в
+    # Prometheus) и с адресов METRICS_ALLOWED_IPS — по умолчанию ни с каких: за прокси без PROXY_FIX_X_FOR
+    # адрес 127.0.0.1 у всех. Проба /readyz ждёт БД не дольше HEALTH_DB_TIMEOUT, секунды
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    METRICS_ALLOWED_IPS = env_list('METRICS_ALLOWED_IPS')
+    METRICS_BUCKETS = tuple(float(b) for b in env_list('METRICS_BUCKETS'))
+    HEALTH_DB_TIMEOUT = float(os.getenv('HEALTH_DB_TIMEOUT', '2'))
+
+    # Настройка загрузки файлов
+    UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+    ALLOWED_EXTENSIONS = {'xls', 'xlsx', 'csv'}
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    # Лимиты файла на маршрутах с потоковой загрузкой (utils/upload_stream.py): смета и картинка скидки, байты.
+    # Тело запроса больше лимита + 1 МБ на поля формы отклоняется (413) по Content-Length до чтения
+    UPLOAD_EXCEL_MAX_SIZE = int(os.getenv('UPLOAD_EXCEL_MAX_SIZE', str(10 * 1024 * 1024)))
+    UPLOAD_IMAGE_MAX_SIZE = int(os.getenv('UPLOAD_IMAGE_MAX_SIZE', str(5 * 1024 * 1024)))
+
+    # Как отдавать загруженные файлы: direct, sendfile (os.sendfile через gunicorn),
+    # x-accel (nginx, location FILE_DELIVERY_ACCEL_PREFIX с internal) или x-sendfile (Apache)
+    FILE_DELIVERY_BACKEND = os.getenv('FILE_DELIVERY_BACKEND', 'sendfile')
+    FILE_DELIVERY_ACCEL_PREFIX = os.getenv('FILE_DELIVERY_ACCEL_PREFIX', '/protected-uploads/')
+
+    # Разбор смет для превью на доске ремонта: потоков в процессе и готовых HTML в кэше
+    ESTIMATE_PREVIEW_WORKERS = int(os.getenv('ESTIMATE_PREVIEW_WORKERS', '1'))
+    ESTIMATE_PREVIEW_CACHE_SIZE = int(os.getenv('ESTIMATE_PREVIEW_CACHE_SIZE', '500'))
+
+    # Сборка мусора в загрузках: файл без ссылок старше grace уходит в карантин, из карантина — удаляется
+    UPLOAD_GC_GRACE_HOURS = float(os.getenv('UPLOAD_GC_GRACE_HOURS', '24'))
+    UPLOAD_GC_QUARANTINE_DAYS = float(os.getenv('UPLOAD_GC_QUARANTINE_DAYS', '7'))
+
+    # Секционирование таблицы visit: сколько месяцев создавать заранее и сколько хранить
+    VISIT_PARTITIONS_AHEAD = int(os.getenv('VISIT_PARTITIONS_AHEAD', '3'))
+    VISIT_RETENTION_MONTHS = int(os.getenv('VISIT_RETENTION_MONTHS', '13'))
+    VISIT_ARCHIVE_OLD_PARTITIONS = os.getenv('VISIT_ARCHIVE_OLD_PARTITIONS', '0') == '1'
+
+    # Фоновые задачи (очистка скидок, секции visit, сборка мусора в загрузках). В бою их выполняет
+    # отдельный процесс `flask scheduler`; create_app() запускает их в потоке рядом с приложением
+    # только при SCHEDULER_ENABLED=1 (python app.py --dev включает сам) — ни gunicorn, ни другие
+    # команды flask (db upgrade и др.) задачи рядом с собой не поднимают
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', '0') == '1'
+
+    # Команды `flask db ...` (Flask-Migrate тянет за собой alembic — веб-серверу он не нужен)
+    MIGRATIONS_ENABLED = True
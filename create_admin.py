@@ -1,11 +1,16 @@
 import os
 import sys
+
 sys.path.append(os.path.dirname(__file__))
 
-from app import app
+from werkzeug.security import generate_password_hash
+
+from app import create_base_app
 from database.engine import db
 from database.models.user import User
-from werkzeug.security import generate_password_hash
+
+# Скрипту нужна только БД — веб-стек, блюпринты и планировщик не загружаем
+app = create_base_app()
 
 with app.app_context():
     # Создаем первого админа
@@ -0,0 +1,10 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database.engine import db
+
+
+def insert(table):
+    """INSERT с поддержкой ON CONFLICT для текущего диалекта (PostgreSQL, для локальных тестов — SQLite)"""
+    if db.engine.dialect.name == 'sqlite':
+        return sqlite.insert(table)
+    return postgresql.insert(table)
@@ -1,20 +0,0 @@
-from datetime import datetime
-
-from database.engine import db
-
-
-class Application(db.Model):
-    __tablename__ = 'applications'
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    phone = db.Column(db.String(20), nullable=False)
-    car_brand = db.Column(db.String(50), nullable=False)
-    car_model = db.Column(db.String(50), nullable=False)
-    desired_date = db.Column(db.Date, nullable=False)
-    desired_time = db.Column(db.Time, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='Новая')
-    comment = db.Column(db.Text, default='')  # Добавляем поле для комментариев
-    def __repr__(self):
-        return f'<Application {self.id} - {self.name}>'
\ No newline at end of file
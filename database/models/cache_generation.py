@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from database.engine import db
+
+
+class CacheGeneration(db.Model):
+    """Номер поколения закэшированных данных: меняется при каждой правке в админке,
+    по нему все процессы узнают, что их кэш устарел"""
+    __tablename__ = 'cache_generation'
+
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -5,6 +5,12 @@ from database.engine import db
 
 class Discount(db.Model):
     __tablename__ = 'discounts'
+    __table_args__ = (
+        # Действующие скидки новые сверху (utils/discount_cache.py)
+        db.Index('ix_discounts_active_created_at', 'created_at', postgresql_where=db.text('is_active')),
+        # Очистка просроченных
+        db.Index('ix_discounts_expires_at', 'expires_at', postgresql_where=db.text('expires_at IS NOT NULL')),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
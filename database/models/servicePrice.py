@@ -5,6 +5,11 @@ from database.engine import db
 
 class ServicePrice(db.Model):
     __tablename__ = 'service_prices'
+    __table_args__ = (
+        # Прайс на сайте — только активные услуги по алфавиту
+        db.Index('ix_service_prices_active_name', 'service_name', postgresql_where=db.text('is_active')),
+        db.Index('ix_service_prices_service_name', 'service_name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     service_name = db.Column(db.String(100), nullable=False)
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from database.engine import db
+
+
+class StoredFile(db.Model):
+    """Файл в хранилище загрузок: одно содержимое — один файл на диске (uploads/ab/cd/<sha256>.xlsx).
+
+    ref_count — сколько записей ссылаются на файл; при нуле файл удаляется."""
+    __tablename__ = 'stored_files'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    path = db.Column(db.String(255), nullable=False, unique=True)   # относительно UPLOAD_FOLDER
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Разобранная смета (utils/estimate_preview.py); None — ещё не разбиралась
+    preview = db.Column(db.JSON, nullable=True)
+
+    def __repr__(self):
+        return f'<StoredFile {self.path} refs={self.ref_count}>'
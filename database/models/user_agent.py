@@ -0,0 +1,10 @@
+from database.engine import db
+
+
+class UserAgent(db.Model):
+    """Словарь строк User-Agent: в visit хранится только ссылка на id"""
+    __tablename__ = 'user_agents'
+
+    id = db.Column(db.Integer, primary_key=True)
+    hash = db.Column(db.String(40), unique=True, nullable=False)  # sha1 от value
+    value = db.Column(db.Text, nullable=False)
@@ -1,9 +1,31 @@
-from datetime import datetime
+from datetime import UTC, datetime
+
 from database.engine import db
 
+
 class Visit(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
+    # Таблица секционирована по месяцам (RANGE по date), поэтому date входит в первичный ключ.
+    # Секции создаёт и удаляет utils/visit_partitions.py
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, nullable=True)
     ip = db.Column(db.String(45))
-    user_agent = db.Column(db.Text)  # Изменил на Text для PostgreSQL
-    date = db.Column(db.Date, default=datetime.utcnow)  # Убрал .date
\ No newline at end of file
+    ua_id = db.Column(db.Integer, db.ForeignKey('user_agents.id'), nullable=False)  # строка UA — в таблице user_agents
+    date = db.Column(db.Date, primary_key=True, default=lambda: datetime.now(UTC).date())
+
+    ua = db.relationship('UserAgent', lazy='joined')
+
+    # Уникальность визита за день — на ней работает INSERT ... ON CONFLICT DO NOTHING из буфера,
+    # эти же индексы обслуживают поиск визитов по (date, ip, ua_id) и (date, user_id)
+    __table_args__ = (
+        db.Index('uq_visit_user_day', 'date', 'user_id', unique=True,
+                 postgresql_where=db.text('user_id IS NOT NULL')),
+        db.Index('uq_visit_guest_day', 'date', 'ip', 'ua_id', unique=True,
+                 postgresql_where=db.text('user_id IS NULL')),
+        # Последние визиты в админке (ORDER BY date DESC по всем секциям)
+        db.Index('ix_visit_date', 'date'),
+        {'postgresql_partition_by': 'RANGE (date)'},
+    )
+
+    @property
+    def user_agent(self):
+        return self.ua.value if self.ua else ''
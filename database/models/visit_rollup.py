@@ -0,0 +1,13 @@
+from database.engine import db
+
+
+class VisitDailyRollup(db.Model):
+    """Счётчики визитов по дням (UTC), ведутся буфером визитов при записи.
+    sketch — регистры HyperLogLog уникальных посетителей дня, общие для всех процессов"""
+    __tablename__ = 'visit_daily_rollup'
+
+    date = db.Column(db.Date, primary_key=True)
+    guests = db.Column(db.Integer, nullable=False, default=0)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    sketch = db.Column(db.LargeBinary, nullable=True)
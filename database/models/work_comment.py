@@ -0,0 +1,35 @@
+from datetime import UTC, datetime
+
+from database.engine import db
+
+
+class WorkComment(db.Model):
+    """Журнал комментариев: каждый комментарий — отдельная строка, текст заказа не переписывается"""
+    __tablename__ = 'work_comments'
+    __table_args__ = (
+        # Последние комментарии каждой строки доски — проход по индексу с конца
+        db.Index('ix_work_comments_entity', 'entity_type', 'entity_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(30), nullable=False)   # 'work_order' и т.п.
+    entity_id = db.Column(db.Integer, nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    body = db.Column(db.Text, nullable=False)
+
+    author = db.relationship('User', lazy='joined')
+
+    @property
+    def author_name(self):
+        if self.author is None:
+            return 'Система'
+        return f'{self.author.first_name} {self.author.last_name}'.strip()
+
+    @property
+    def local_created_at(self):
+        """created_at хранится в UTC; в журнале показывается местное время сервера"""
+        return self.created_at.replace(tzinfo=UTC).astimezone()
+
+    def __repr__(self):
+        return f'<WorkComment {self.entity_type}:{self.entity_id} #{self.id}>'
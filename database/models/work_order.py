@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from database.engine import db
+
+# Этапы заказа: заявка -> очередь -> ремонт -> выполнен (или отменён на любом этапе)
+NEW = 'new'
+QUEUED = 'queued'
+IN_SERVICE = 'in_service'
+COMPLETED = 'completed'
+CANCELLED = 'cancelled'
+
+STATUSES = (NEW, QUEUED, IN_SERVICE, COMPLETED, CANCELLED)
+
+STATUS_LABELS = {
+    NEW: 'Новая',
+    QUEUED: 'В очереди',
+    IN_SERVICE: 'В ремонте',
+    COMPLETED: 'Выполнен',
+    CANCELLED: 'Отменён',
+}
+
+
+class WorkOrder(db.Model):
+    """Заказ на всём пути от заявки до выдачи автомобиля: этап хранится в status,
+    переход между этапами — один UPDATE (utils/work_orders.py), строка не копируется"""
+    __tablename__ = 'work_order'
+    __table_args__ = (
+        # Доски админки: у каждого активного этапа свой частичный индекс
+        db.Index('ix_work_order_new', 'desired_date', 'desired_time', 'id',
+                 postgresql_where=db.text("status = 'new'")),
+        db.Index('ix_work_order_queued', 'desired_date', 'desired_time', 'id',
+                 postgresql_where=db.text("status = 'queued'")),
+        db.Index('ix_work_order_in_service', 'estimated_completion',
+                 postgresql_where=db.text("status = 'in_service'")),
+        # Список заявок с фильтрами по всем этапам
+        db.Index('ix_work_order_desired_at', 'desired_date', 'desired_time', 'id'),
+        db.Index('ix_work_order_created_at', 'created_at'),
+        db.Index('ix_work_order_completed_at', 'completed_at',
+                 postgresql_where=db.text("status = 'completed'")),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.Enum(*STATUSES, name='work_order_status'), nullable=False, default=NEW)
+
+    name = db.Column(db.String(100), nullable=False)
+    phone = db.Column(db.String(50), nullable=False)
+    car_brand = db.Column(db.String(50), nullable=False)
+    car_model = db.Column(db.String(50), nullable=False)
+    desired_date = db.Column(db.Date, nullable=False)
+    desired_time = db.Column(db.Time, nullable=False)
+    comment = db.Column(db.Text, default='')
+
+    # Заполняется при постановке в ремонт
+    estimated_completion = db.Column(db.Date, nullable=True)
+    estimated_cost = db.Column(db.Numeric(10, 2), nullable=True)
+    work_list = db.Column(db.Text, default='')
+    excel_file = db.Column(db.String(255), nullable=True)  # Путь к смете в хранилище (stored_files.path)
+    excel_name = db.Column(db.String(255), nullable=True)  # Имя файла, как его загрузили
+
+    # Время переходов между этапами
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    queued_at = db.Column(db.DateTime, nullable=True)
+    service_started_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    cancelled_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def status_label(self):
+        return STATUS_LABELS.get(self.status, self.status)
+
+    def __repr__(self):
+        return f'<WorkOrder {self.id} {self.status} - {self.name}>'
@@ -0,0 +1,42 @@
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool, который считает, сколько запросы ждали свободное соединение.
+
+    Ожидание появляется, когда все pool_size + max_overflow соединений заняты: тогда
+    QueuePool блокируется на очереди пула. Меряется только это блокирующее ожидание —
+    установка нового соединения (overflow) в него не входит. Суммарное время отдаётся
+    в метрики (utils/metrics.py)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._stats_lock = threading.Lock()
+
+        queue_get = self._pool.get
+
+        def timed_get(block=True, timeout=None):
+            if not block:
+                return queue_get(block, timeout)
+            started = time.perf_counter()
+            try:
+                return queue_get(block, timeout)
+            finally:
+                waited = time.perf_counter() - started
+                with self._stats_lock:
+                    self.wait_seconds += waited
+                    self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self._pool.get = timed_get
+
+    def _do_get(self):
+        with self._stats_lock:
+            self.checkouts += 1
+        return super()._do_get()
+
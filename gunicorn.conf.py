@@ -0,0 +1,46 @@
+# gunicorn.conf.py — боевой запуск: gunicorn -c gunicorn.conf.py wsgi:app
+# Все параметры можно переопределить переменными окружения WEB_*
+
+import multiprocessing
+import os
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', '4'))
+worker_class = 'gthread'
+
+# Приложение загружается один раз в мастере, воркеры получают его через fork
+# (copy-on-write). Минус: HUP не подхватывает новый код — нужен полный перезапуск
+preload_app = os.getenv('WEB_PRELOAD', '1') == '1'
+
+# Воркер перезапускается после max_requests запросов (разброс — чтобы не все сразу)
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', '100'))
+
+timeout = int(os.getenv('WEB_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+# Фоновые задачи здесь не запускаются — ни в мастере, ни в воркерах: их выполняет
+# отдельный процесс `flask scheduler` (сервис scheduler в docker-compose.yml)
+
+
+def post_fork(server, worker):
+    # Соединения из пула мастера нельзя делить с воркером — свой пул в каждом процессе
+    if not server.cfg.preload_app:
+        return
+    from database.engine import db
+
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # Дописываем в БД визиты, накопленные воркером
+    from utils.visit_buffer import visit_buffer
+
+    visit_buffer.stop()
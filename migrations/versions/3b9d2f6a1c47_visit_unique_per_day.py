@@ -0,0 +1,42 @@
+"""Visit unique per day
+
+Revision ID: 3b9d2f6a1c47
+Revises: fe7515f2d5a9
+Create Date: 2026-10-18 10:12:41.208113
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2f6a1c47'
+down_revision = 'fe7515f2d5a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Убираем дубли, которые могли появиться из-за гонки в старом log_visit
+    op.execute("""
+        DELETE FROM visit v
+        USING visit d
+        WHERE v.id > d.id
+          AND v.date IS NOT DISTINCT FROM d.date
+          AND (
+                (v.user_id IS NOT NULL AND v.user_id = d.user_id)
+             OR (v.user_id IS NULL AND d.user_id IS NULL
+                 AND v.ip IS NOT DISTINCT FROM d.ip
+                 AND md5(coalesce(v.user_agent, '')) = md5(coalesce(d.user_agent, '')))
+          )
+    """)
+
+    op.create_index('uq_visit_user_day', 'visit', ['date', 'user_id'], unique=True,
+                    postgresql_where=sa.text('user_id IS NOT NULL'))
+    op.create_index('uq_visit_guest_day', 'visit',
+                    ['date', 'ip', sa.text("md5(coalesce(user_agent, ''))")], unique=True,
+                    postgresql_where=sa.text('user_id IS NULL'))
+
+
+def downgrade():
+    op.drop_index('uq_visit_guest_day', table_name='visit')
+    op.drop_index('uq_visit_user_day', table_name='visit')
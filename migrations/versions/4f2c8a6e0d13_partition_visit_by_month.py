@@ -0,0 +1,99 @@
+"""Partition visit by month
+
+Revision ID: 4f2c8a6e0d13
+Revises: c5a7e3d91b08
+Create Date: 2026-10-18 14:27:19.380551
+
+"""
+from datetime import date
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '4f2c8a6e0d13'
+down_revision = 'c5a7e3d91b08'
+branch_labels = None
+depends_on = None
+
+# Сколько месяцев вперёд создать секции сразу (дальше этим занимается utils/visit_partitions.py)
+MONTHS_AHEAD = 3
+
+
+def _month(d, shift=0):
+    index = d.year * 12 + (d.month - 1) + shift
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    op.drop_index('uq_visit_guest_day', table_name='visit')
+    op.drop_index('uq_visit_user_day', table_name='visit')
+    op.execute("ALTER TABLE visit RENAME TO visit_old")
+    op.execute("ALTER TABLE visit_old RENAME CONSTRAINT visit_pkey TO visit_old_pkey")
+    op.execute("ALTER TABLE visit_old RENAME CONSTRAINT visit_ua_id_fkey TO visit_old_ua_id_fkey")
+
+    # Ключ секционирования обязан входить в первичный ключ и уникальные индексы
+    op.execute("""
+        CREATE TABLE visit (
+            id integer NOT NULL DEFAULT nextval('visit_id_seq'),
+            user_id integer,
+            ip varchar(45),
+            ua_id integer NOT NULL,
+            date date NOT NULL,
+            CONSTRAINT visit_pkey PRIMARY KEY (id, date),
+            CONSTRAINT visit_ua_id_fkey FOREIGN KEY (ua_id) REFERENCES user_agents (id)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute("ALTER SEQUENCE visit_id_seq OWNED BY visit.id")
+    op.create_index('uq_visit_user_day', 'visit', ['date', 'user_id'], unique=True,
+                    postgresql_where=sa.text('user_id IS NOT NULL'))
+    op.create_index('uq_visit_guest_day', 'visit', ['date', 'ip', 'ua_id'], unique=True,
+                    postgresql_where=sa.text('user_id IS NULL'))
+
+    # Секции с первого месяца, за который есть визиты, и на несколько месяцев вперёд
+    today = date.today()
+    first = conn.execute(sa.text("SELECT min(date) FROM visit_old")).scalar() or today
+    month = _month(first)
+    last = _month(today, MONTHS_AHEAD)
+    while month <= last:
+        name = f"visit_y{month.year}m{month.month:02d}"
+        op.execute(
+            f"CREATE TABLE {name} PARTITION OF visit "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_month(month, 1).isoformat()}')"
+        )
+        month = _month(month, 1)
+    # DEFAULT-секцию не создаём: с ней нельзя отключать секции через DETACH CONCURRENTLY.
+    # Если секции на месяц нет, вставка падает, и буфер визитов повторит её позже
+
+    # Визиты без даты не попадают ни в одну статистику — не переносим их
+    op.execute("""
+        INSERT INTO visit (id, user_id, ip, ua_id, date)
+        SELECT id, user_id, ip, ua_id, date FROM visit_old WHERE date IS NOT NULL
+    """)
+    op.execute("DROP TABLE visit_old")
+
+
+def downgrade():
+    op.execute("""
+        CREATE TABLE visit_plain (
+            id integer NOT NULL DEFAULT nextval('visit_id_seq'),
+            user_id integer,
+            ip varchar(45),
+            ua_id integer NOT NULL,
+            date date,
+            CONSTRAINT visit_plain_pkey PRIMARY KEY (id),
+            CONSTRAINT visit_plain_ua_id_fkey FOREIGN KEY (ua_id) REFERENCES user_agents (id)
+        )
+    """)
+    op.execute("INSERT INTO visit_plain (id, user_id, ip, ua_id, date) SELECT id, user_id, ip, ua_id, date FROM visit")
+    op.execute("ALTER SEQUENCE visit_id_seq OWNED BY visit_plain.id")
+    op.execute("DROP TABLE visit")
+    op.execute("ALTER TABLE visit_plain RENAME TO visit")
+    op.execute("ALTER TABLE visit RENAME CONSTRAINT visit_plain_pkey TO visit_pkey")
+    op.execute("ALTER TABLE visit RENAME CONSTRAINT visit_plain_ua_id_fkey TO visit_ua_id_fkey")
+    op.create_index('uq_visit_user_day', 'visit', ['date', 'user_id'], unique=True,
+                    postgresql_where=sa.text('user_id IS NOT NULL'))
+    op.create_index('uq_visit_guest_day', 'visit', ['date', 'ip', 'ua_id'], unique=True,
+                    postgresql_where=sa.text('user_id IS NULL'))
@@ -0,0 +1,24 @@
+"""Applications keyset index
+
+Revision ID: 6b3e9d2f4a71
+Revises: a1d7e4b9c260
+Create Date: 2026-10-18 15:22:19.604113
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6b3e9d2f4a71'
+down_revision = 'a1d7e4b9c260'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.create_index('ix_applications_desired_at', ['desired_date', 'desired_time', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_index('ix_applications_desired_at')
@@ -0,0 +1,41 @@
+"""Visit daily rollup
+
+Revision ID: 8e1f0c5d7a92
+Revises: 3b9d2f6a1c47
+Create Date: 2026-10-18 11:40:07.532190
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8e1f0c5d7a92'
+down_revision = '3b9d2f6a1c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('visit_daily_rollup',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('guests', sa.Integer(), nullable=False),
+    sa.Column('users', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('date')
+    )
+
+    # Первичное заполнение из уже накопленных визитов
+    op.execute("""
+        INSERT INTO visit_daily_rollup (date, guests, users, total)
+        SELECT date,
+               count(*) FILTER (WHERE user_id IS NULL),
+               count(*) FILTER (WHERE user_id IS NOT NULL),
+               count(*)
+        FROM visit
+        WHERE date IS NOT NULL
+        GROUP BY date
+    """)
+
+
+def downgrade():
+    op.drop_table('visit_daily_rollup')
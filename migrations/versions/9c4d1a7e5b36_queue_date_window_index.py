@@ -0,0 +1,24 @@
+"""Queue date window index
+
+Revision ID: 9c4d1a7e5b36
+Revises: 6b3e9d2f4a71
+Create Date: 2026-10-18 15:58:02.417736
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9c4d1a7e5b36'
+down_revision = '6b3e9d2f4a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.create_index('ix_queue_desired_at', ['desired_date', 'desired_time', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.drop_index('ix_queue_desired_at')
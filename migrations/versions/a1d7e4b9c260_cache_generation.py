@@ -0,0 +1,28 @@
+"""Cache generation counters
+
+Revision ID: a1d7e4b9c260
+Revises: 4f2c8a6e0d13
+Create Date: 2026-10-18 14:05:41.208317
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'a1d7e4b9c260'
+down_revision = '4f2c8a6e0d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cache_generation',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('generation', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('cache_generation')
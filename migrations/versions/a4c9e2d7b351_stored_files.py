@@ -0,0 +1,97 @@
+"""Content-addressed stored_files for uploaded estimates
+
+Revision ID: a4c9e2d7b351
+Revises: f3b8d1e5c620
+Create Date: 2026-10-18 19:02:15.418377
+
+"""
+import hashlib
+import os
+import shutil
+from datetime import UTC, datetime
+
+import sqlalchemy as sa
+from alembic import context, op
+
+from config import Config
+
+# revision identifiers, used by Alembic.
+revision = 'a4c9e2d7b351'
+down_revision = 'f3b8d1e5c620'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    stored_files = op.create_table('stored_files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path'),
+    sa.UniqueConstraint('sha256')
+    )
+    with op.batch_alter_table('work_order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excel_name', sa.String(length=255), nullable=True))
+
+    # Уже загруженные сметы переезжают в хранилище: одинаковые файлы
+    # (повторные загрузки вида 1_1756127036_1758466543_1_1758556220.xlsx) сливаются в один.
+    # Каталог — flask db upgrade -x upload_folder=..., по умолчанию из config.py
+    conn = op.get_bind()
+    root = context.get_x_argument(as_dictionary=True).get('upload_folder', Config.UPLOAD_FOLDER)
+    rows = conn.execute(sa.text("SELECT id, excel_file FROM work_order WHERE excel_file IS NOT NULL")).all()
+    files = {}      # sha256 -> строка stored_files
+    moved = {}      # старое имя -> (новый путь, sha256)
+    for order_id, name in rows:
+        if name not in moved:
+            source = os.path.join(root, name)
+            if not os.path.isfile(source):
+                continue    # файла нет — ссылка остаётся как есть
+            sha256 = _sha256(source)
+            ext = os.path.splitext(name)[1].lower()
+            if sha256 not in files:
+                now = datetime.now(UTC).replace(tzinfo=None)
+                files[sha256] = {
+                    'sha256': sha256, 'path': f"{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}",
+                    'size': os.path.getsize(source), 'ref_count': 0,
+                    'created_at': now, 'updated_at': now,
+                }
+            moved[name] = (files[sha256]['path'], sha256)
+        path, sha256 = moved[name]
+        files[sha256]['ref_count'] += 1
+        conn.execute(sa.text("UPDATE work_order SET excel_file = :path, excel_name = :name WHERE id = :id"),
+                     {'path': path, 'name': name, 'id': order_id})
+
+    if files:
+        op.bulk_insert(stored_files, list(files.values()))
+    # Файлы не переносятся, а связываются жёсткой ссылкой (или копируются): транзакция ещё открыта,
+    # и при откате старые имена должны остаться на месте. Старые имена после коммита, а новые
+    # после отката ни на что в БД не ссылаются — их удалит сборка мусора (flask uploads-gc)
+    for name, (path, _) in moved.items():
+        target = os.path.join(root, path)
+        if os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(os.path.join(root, name), target)
+        except OSError:
+            shutil.copy2(os.path.join(root, name), target)
+
+
+def downgrade():
+    # Файлы остаются в uploads/ab/cd/: work_order.excel_file хранит путь к ним, просмотр смет работает и без хранилища
+    with op.batch_alter_table('work_order', schema=None) as batch_op:
+        batch_op.drop_column('excel_name')
+    op.drop_table('stored_files')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,270 @@
+"""Single work_order table instead of applications/queue/in_service/completed_service
+
+Revision ID: b7f2e6c0a913
+Revises: e8a5c3f17d24
+Create Date: 2026-10-18 17:12:05.418263
+
+"""
+from datetime import UTC, datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b7f2e6c0a913'
+down_revision = 'e8a5c3f17d24'
+branch_labels = None
+depends_on = None
+
+STATUS = sa.Enum('new', 'queued', 'in_service', 'completed', 'cancelled', name='work_order_status')
+
+# Поля клиента и записи, общие для всех четырёх старых таблиц
+COMMON = ('name', 'phone', 'car_brand', 'car_model', 'desired_date', 'desired_time', 'comment')
+
+
+def upgrade():
+    work_order = op.create_table('work_order',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', STATUS, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('phone', sa.String(length=50), nullable=False),
+    sa.Column('car_brand', sa.String(length=50), nullable=False),
+    sa.Column('car_model', sa.String(length=50), nullable=False),
+    sa.Column('desired_date', sa.Date(), nullable=False),
+    sa.Column('desired_time', sa.Time(), nullable=False),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('estimated_completion', sa.Date(), nullable=True),
+    sa.Column('estimated_cost', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('work_list', sa.Text(), nullable=True),
+    sa.Column('excel_file', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('queued_at', sa.DateTime(), nullable=True),
+    sa.Column('service_started_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('cancelled_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    orders = _fold_old_tables(op.get_bind())
+    if orders:
+        op.bulk_insert(work_order, orders)
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('work_order', 'id'), "
+        "COALESCE((SELECT MAX(id) FROM work_order), 0) + 1, false)"
+    )
+
+    # Индексы строятся после переноса строк
+    with op.batch_alter_table('work_order', schema=None) as batch_op:
+        batch_op.create_index('ix_work_order_new', ['desired_date', 'desired_time', 'id'], unique=False,
+                              postgresql_where=sa.text("status = 'new'"))
+        batch_op.create_index('ix_work_order_queued', ['desired_date', 'desired_time', 'id'], unique=False,
+                              postgresql_where=sa.text("status = 'queued'"))
+        batch_op.create_index('ix_work_order_in_service', ['estimated_completion'], unique=False,
+                              postgresql_where=sa.text("status = 'in_service'"))
+        batch_op.create_index('ix_work_order_desired_at', ['desired_date', 'desired_time', 'id'], unique=False)
+        batch_op.create_index('ix_work_order_created_at', ['created_at'], unique=False)
+        batch_op.create_index('ix_work_order_completed_at', ['completed_at'], unique=False,
+                              postgresql_where=sa.text("status = 'completed'"))
+
+    op.drop_table('completed_service')
+    op.drop_table('in_service')
+    op.drop_table('queue')
+    op.drop_table('applications')
+
+
+def _fold_old_tables(conn):
+    """Собирает по одной строке work_order на заказ из четырёх старых таблиц.
+
+    Заказ сохраняет id заявки. Строки очереди и ремонта привязываются к заказу
+    по application_id/queue_id, а если связи нет — по (phone, created_at), которые
+    копировались на каждом шаге. Непривязанные строки становятся отдельными заказами.
+    Побеждает самый поздний этап; текст берётся из него же — он редактировался последним."""
+    now = datetime.now(UTC).replace(tzinfo=None)
+    orders = []
+    by_key = {}     # (phone, created_at) -> заказы в порядке создания
+
+    def rows(sql):
+        return conn.execute(sa.text(sql)).mappings().all()
+
+    def new_order(row, status):
+        order = {field: row[field] for field in COMMON}
+        order.update(id=None, status=status, created_at=row['created_at'] or now, work_list='',
+                     estimated_completion=None, estimated_cost=None, excel_file=None,
+                     queued_at=None, service_started_at=None, completed_at=None, cancelled_at=None)
+        orders.append(order)
+        by_key.setdefault((row['phone'], row['created_at']), []).append(order)
+        return order
+
+    def attach(row, linked, stages, status):
+        candidates = ([linked] if linked is not None else []) + by_key.get((row['phone'], row['created_at']), [])
+        order = next((o for o in candidates if o['status'] in stages), None)
+        if order is None:
+            order = new_order(row, status)
+        else:
+            order.update({field: row[field] for field in COMMON if row[field] is not None})
+            order['status'] = status
+        order['cancelled_at'] = None
+        return order
+
+    applications = {}
+    for row in rows("SELECT * FROM applications ORDER BY id"):
+        # 'Обработана' — временная метка: станет queued/in_service/... или cancelled ниже
+        status = {'отклонено': 'cancelled', 'Обработана': 'processed'}.get(row['status'], 'new')
+        order = new_order(row, status)
+        order['id'] = row['id']
+        if status == 'cancelled':
+            order['cancelled_at'] = order['created_at']
+        applications[row['id']] = order
+
+    stages = ('new', 'processed', 'cancelled')
+    queue_orders = {}
+    for row in rows("SELECT * FROM queue ORDER BY id"):
+        order = attach(row, applications.get(row['application_id']), stages, 'queued')
+        order['queued_at'] = row['moved_at'] or order['created_at']
+        queue_orders[row['id']] = order
+
+    for table, status, stamp, previous in (('in_service', 'in_service', 'service_started_at', 'queued'),
+                                           ('completed_service', 'completed', 'completed_at', 'in_service')):
+        stages += (previous,)
+        for row in rows(f"SELECT * FROM {table} ORDER BY id"):
+            order = attach(row, queue_orders.get(row['queue_id']), stages, status)
+            completion = row['estimated_completion']
+            order.update(
+                estimated_completion=completion.date() if isinstance(completion, datetime) else completion,
+                estimated_cost=row['estimated_cost'],
+                work_list=row['work_list'] or '',
+                excel_file=row['excel_file'],
+            )
+            order[stamp] = row['moved_at'] or now
+            if status == 'completed' and not order['service_started_at']:
+                order['service_started_at'] = order['completed_at']
+
+    next_id = max(applications, default=0) + 1
+    for order in orders:
+        if order['status'] == 'processed':
+            # Заявка обработана, но дальше нигде не числится — её удалили из очереди или ремонта
+            order['status'] = 'cancelled'
+            order['cancelled_at'] = order['created_at']
+        if order['id'] is None:
+            order['id'] = next_id
+            next_id += 1
+        for field in ('name', 'phone', 'car_brand', 'car_model', 'comment'):
+            order[field] = order[field] or ''
+        order['desired_date'] = order['desired_date'] or order['created_at'].date()
+        order['desired_time'] = order['desired_time'] or order['created_at'].time()
+    return orders
+
+
+def downgrade():
+    op.create_table('applications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=False),
+    sa.Column('car_brand', sa.String(length=50), nullable=False),
+    sa.Column('car_model', sa.String(length=50), nullable=False),
+    sa.Column('desired_date', sa.Date(), nullable=False),
+    sa.Column('desired_time', sa.Time(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('queue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('application_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=False),
+    sa.Column('car_brand', sa.String(length=50), nullable=False),
+    sa.Column('car_model', sa.String(length=50), nullable=False),
+    sa.Column('desired_date', sa.Date(), nullable=False),
+    sa.Column('desired_time', sa.Time(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('moved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['application_id'], ['applications.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('in_service',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('queue_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=False),
+    sa.Column('car_brand', sa.String(length=50), nullable=False),
+    sa.Column('car_model', sa.String(length=50), nullable=False),
+    sa.Column('desired_date', sa.Date(), nullable=False),
+    sa.Column('desired_time', sa.Time(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('estimated_completion', sa.Date(), nullable=True),
+    sa.Column('estimated_cost', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('work_list', sa.Text(), nullable=True),
+    sa.Column('excel_file', sa.String(length=255), nullable=True),
+    sa.Column('moved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['queue_id'], ['queue.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('completed_service',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('queue_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('phone', sa.String(length=50), nullable=True),
+    sa.Column('car_brand', sa.String(length=50), nullable=True),
+    sa.Column('car_model', sa.String(length=50), nullable=True),
+    sa.Column('desired_date', sa.Date(), nullable=True),
+    sa.Column('desired_time', sa.Time(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('estimated_completion', sa.DateTime(), nullable=True),
+    sa.Column('estimated_cost', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('work_list', sa.Text(), nullable=True),
+    sa.Column('excel_file', sa.String(length=200), nullable=True),
+    sa.Column('moved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['queue_id'], ['queue.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Каждый заказ снова становится заявкой с тем же id и копией в таблице своего этапа
+    op.execute("""
+        INSERT INTO applications (id, name, phone, car_brand, car_model, desired_date, desired_time,
+                                  created_at, status, comment)
+        SELECT id, name, LEFT(phone, 20), car_brand, car_model, desired_date, desired_time, created_at,
+               CASE status WHEN 'new' THEN 'Новая' WHEN 'cancelled' THEN 'отклонено' ELSE 'Обработана' END,
+               comment
+        FROM work_order
+    """)
+    op.execute("""
+        INSERT INTO queue (application_id, name, phone, car_brand, car_model, desired_date, desired_time,
+                           created_at, status, comment, moved_at)
+        SELECT id, name, LEFT(phone, 20), car_brand, car_model, desired_date, desired_time, created_at,
+               'in_queue', comment, queued_at
+        FROM work_order WHERE status = 'queued' ORDER BY id
+    """)
+    op.execute("""
+        INSERT INTO in_service (name, phone, car_brand, car_model, desired_date, desired_time, created_at,
+                                estimated_completion, estimated_cost, comment, work_list, excel_file, moved_at)
+        SELECT name, LEFT(phone, 20), car_brand, car_model, desired_date, desired_time, created_at,
+               estimated_completion, estimated_cost, comment, work_list, excel_file, service_started_at
+        FROM work_order WHERE status = 'in_service' ORDER BY id
+    """)
+    op.execute("""
+        INSERT INTO completed_service (name, phone, car_brand, car_model, desired_date, desired_time, created_at,
+                                       estimated_completion, estimated_cost, comment, work_list, excel_file, moved_at)
+        SELECT name, phone, car_brand, car_model, desired_date, desired_time, created_at,
+               estimated_completion, estimated_cost, comment, work_list, excel_file, completed_at
+        FROM work_order WHERE status = 'completed' ORDER BY id
+    """)
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('applications', 'id'), "
+        "COALESCE((SELECT MAX(id) FROM applications), 0) + 1, false)"
+    )
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.create_index('ix_applications_desired_at', ['desired_date', 'desired_time', 'id'], unique=False)
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.create_index('ix_queue_desired_at', ['desired_date', 'desired_time', 'id'], unique=False)
+    with op.batch_alter_table('in_service', schema=None) as batch_op:
+        batch_op.create_index('ix_in_service_estimated_completion', ['estimated_completion'], unique=False)
+
+    op.drop_table('work_order')
+    STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,89 @@
+"""User agents dictionary
+
+Revision ID: c5a7e3d91b08
+Revises: 8e1f0c5d7a92
+Create Date: 2026-10-18 13:02:55.914620
+
+"""
+import hashlib
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c5a7e3d91b08'
+down_revision = '8e1f0c5d7a92'
+branch_labels = None
+depends_on = None
+
+# Сколько визитов переносить за одну транзакцию
+BATCH_SIZE = 10000
+
+# Должно совпадать с utils.user_agents: строка обрезается до 1024 символов, hash = sha1 в hex.
+# sha1 в PostgreSQL есть только в pgcrypto, поэтому хэш считается здесь, в Python
+UA_VALUE = "left(coalesce(v.user_agent, ''), 1024)"
+
+
+def upgrade():
+    op.create_table('user_agents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hash', sa.String(length=40), nullable=False),
+    sa.Column('value', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('hash')
+    )
+    op.add_column('visit', sa.Column('ua_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('visit_ua_id_fkey', 'visit', 'user_agents', ['ua_id'], ['id'])
+
+    # Переносим строки пачками по id, каждая пачка — своя транзакция
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        min_id, max_id = conn.execute(sa.text("SELECT min(id), max(id) FROM visit")).one()
+        if min_id is not None:
+            for start in range(min_id, max_id + 1, BATCH_SIZE):
+                params = {'start': start, 'end': start + BATCH_SIZE}
+                values = conn.execute(sa.text(f"""
+                    SELECT DISTINCT {UA_VALUE} FROM visit v
+                    WHERE v.id >= :start AND v.id < :end
+                """), params).scalars().all()
+                if not values:
+                    continue
+                conn.execute(sa.text("""
+                    INSERT INTO user_agents (hash, value) VALUES (:hash, :value)
+                    ON CONFLICT (hash) DO NOTHING
+                """), [{'hash': hashlib.sha1(v.encode('utf-8', 'replace')).hexdigest(), 'value': v} for v in values])
+                conn.execute(sa.text(f"""
+                    UPDATE visit v SET ua_id = u.id
+                    FROM user_agents u
+                    WHERE v.id >= :start AND v.id < :end
+                      AND u.value = {UA_VALUE}
+                """), params)
+
+    # После обрезки до 1024 символов могли совпасть визиты, различавшиеся только хвостом UA
+    op.execute("""
+        DELETE FROM visit v
+        USING visit d
+        WHERE v.id > d.id
+          AND v.user_id IS NULL AND d.user_id IS NULL
+          AND v.date IS NOT DISTINCT FROM d.date
+          AND v.ip IS NOT DISTINCT FROM d.ip
+          AND v.ua_id = d.ua_id
+    """)
+
+    op.drop_index('uq_visit_guest_day', table_name='visit')
+    op.alter_column('visit', 'ua_id', existing_type=sa.Integer(), nullable=False)
+    op.drop_column('visit', 'user_agent')
+    op.create_index('uq_visit_guest_day', 'visit', ['date', 'ip', 'ua_id'], unique=True,
+                    postgresql_where=sa.text('user_id IS NULL'))
+
+
+def downgrade():
+    op.add_column('visit', sa.Column('user_agent', sa.Text(), nullable=True))
+    op.execute("UPDATE visit v SET user_agent = u.value FROM user_agents u WHERE u.id = v.ua_id")
+    op.drop_index('uq_visit_guest_day', table_name='visit')
+    op.drop_constraint('visit_ua_id_fkey', 'visit', type_='foreignkey')
+    op.drop_column('visit', 'ua_id')
+    op.create_index('uq_visit_guest_day', 'visit',
+                    ['date', 'ip', sa.text("md5(coalesce(user_agent, ''))")], unique=True,
+                    postgresql_where=sa.text('user_id IS NULL'))
+    op.drop_table('user_agents')
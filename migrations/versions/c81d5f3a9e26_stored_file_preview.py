@@ -0,0 +1,26 @@
+"""Parsed estimate preview on stored_files
+
+Revision ID: c81d5f3a9e26
+Revises: a4c9e2d7b351
+Create Date: 2026-10-18 20:11:37.552901
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c81d5f3a9e26'
+down_revision = 'a4c9e2d7b351'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Уже загруженные сметы разбирает `flask estimate-previews`
+    with op.batch_alter_table('stored_files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('preview', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('stored_files', schema=None) as batch_op:
+        batch_op.drop_column('preview')
@@ -0,0 +1,92 @@
+"""Append-only work_comments log
+
+Revision ID: d2a6f8c41e57
+Revises: b7f2e6c0a913
+Create Date: 2026-10-18 17:48:22.631904
+
+"""
+import re
+from datetime import UTC, datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6f8c41e57'
+down_revision = 'b7f2e6c0a913'
+branch_labels = None
+depends_on = None
+
+# Так add_comment дописывал комментарии в конец текста: "\n[18.10.2026 17:48]: текст"
+STAMP = re.compile(r'^\[(\d{2}\.\d{2}\.\d{4} \d{2}:\d{2})\]: ', re.MULTILINE)
+STAMP_FORMAT = '%d.%m.%Y %H:%M'
+
+
+def _stamp_to_utc(stamp):
+    # Отметки писались по местному времени сервера (datetime.now()), work_comments.created_at — UTC
+    return datetime.strptime(stamp, STAMP_FORMAT).astimezone(UTC).replace(tzinfo=None)
+
+
+def _utc_to_stamp(created_at):
+    return created_at.replace(tzinfo=UTC).astimezone().strftime(STAMP_FORMAT)
+
+
+def upgrade():
+    work_comments = op.create_table('work_comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['user.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Дописанные комментарии переезжают из work_order.comment в журнал,
+    # в самом поле остаётся только текст до первой отметки времени
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, comment FROM work_order WHERE comment ~ '(^|\\n)\\[\\d{2}\\.\\d{2}\\.\\d{4} \\d{2}:\\d{2}\\]: '"
+    )).all()
+    comments = []
+    for order_id, text in rows:
+        matches = list(STAMP.finditer(text))
+        for match, following in zip(matches, matches[1:] + [None]):
+            body = text[match.end():following.start() if following else len(text)].strip()
+            if body:
+                comments.append({
+                    'entity_type': 'work_order',
+                    'entity_id': order_id,
+                    'author_id': None,
+                    'created_at': _stamp_to_utc(match.group(1)),
+                    'body': body,
+                })
+        conn.execute(sa.text("UPDATE work_order SET comment = :comment WHERE id = :id"),
+                     {'comment': text[:matches[0].start()].strip(), 'id': order_id})
+    if comments:
+        op.bulk_insert(work_comments, comments)
+
+    with op.batch_alter_table('work_comments', schema=None) as batch_op:
+        batch_op.create_index('ix_work_comments_entity', ['entity_type', 'entity_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    # Журнал снова дописывается в конец work_order.comment
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT entity_id, created_at, body FROM work_comments "
+        "WHERE entity_type = 'work_order' ORDER BY entity_id, created_at, id"
+    )).all()
+    appended = {}
+    for order_id, created_at, body in rows:
+        appended.setdefault(order_id, []).append(f"[{_utc_to_stamp(created_at)}]: {body}")
+    for order_id, lines in appended.items():
+        conn.execute(sa.text(
+            "UPDATE work_order SET comment = CONCAT_WS(E'\\n', NULLIF(comment, ''), CAST(:lines AS text)) WHERE id = :id"
+        ), {'lines': '\n'.join(lines), 'id': order_id})
+
+    with op.batch_alter_table('work_comments', schema=None) as batch_op:
+        batch_op.drop_index('ix_work_comments_entity')
+
+    op.drop_table('work_comments')
@@ -0,0 +1,26 @@
+"""HyperLogLog registers of unique visitors on visit_daily_rollup
+
+Revision ID: e2c7a4f9b815
+Revises: c81d5f3a9e26
+Create Date: 2026-10-18 22:04:51.318260
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e2c7a4f9b815'
+down_revision = 'c81d5f3a9e26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Регистры копятся с момента обновления: прошлые уникальные по таблице visit не восстанавливаются
+    with op.batch_alter_table('visit_daily_rollup', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sketch', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('visit_daily_rollup', schema=None) as batch_op:
+        batch_op.drop_column('sketch')
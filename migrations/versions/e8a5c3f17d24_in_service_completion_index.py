@@ -0,0 +1,24 @@
+"""In-service estimated completion index
+
+Revision ID: e8a5c3f17d24
+Revises: 9c4d1a7e5b36
+Create Date: 2026-10-18 16:31:47.085329
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e8a5c3f17d24'
+down_revision = '9c4d1a7e5b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('in_service', schema=None) as batch_op:
+        batch_op.create_index('ix_in_service_estimated_completion', ['estimated_completion'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('in_service', schema=None) as batch_op:
+        batch_op.drop_index('ix_in_service_estimated_completion')
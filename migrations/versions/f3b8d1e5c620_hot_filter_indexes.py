@@ -0,0 +1,81 @@
+"""Indexes for hot filters of prices, discounts and visits
+
+Revision ID: f3b8d1e5c620
+Revises: d2a6f8c41e57
+Create Date: 2026-10-18 18:21:40.902716
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d1e5c620'
+down_revision = 'd2a6f8c41e57'
+branch_labels = None
+depends_on = None
+
+# (имя, таблица, колонки, условие частичного индекса)
+INDEXES = [
+    # Прайс на сайте: активные услуги по названию; в админке — поиск дубля по названию
+    ('ix_service_prices_active_name', 'service_prices', 'service_name', 'is_active'),
+    ('ix_service_prices_service_name', 'service_prices', 'service_name', None),
+    # Действующие скидки новые сверху; очистка просроченных по expires_at
+    ('ix_discounts_active_created_at', 'discounts', 'created_at', 'is_active'),
+    ('ix_discounts_expires_at', 'discounts', 'expires_at', 'expires_at IS NOT NULL'),
+]
+
+# Индекс секционированной таблицы visit: последние визиты в админке
+VISIT_INDEX = ('ix_visit_date', 'date')
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            _create_concurrently(name, table, columns, where)
+        _create_partitioned(*VISIT_INDEX)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX IF EXISTS {VISIT_INDEX[0]}")
+        for name, _table, _columns, _where in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def _index_state(name):
+    """None — индекса нет, True/False — индекс есть и валиден/нет (прерванный CONCURRENTLY)"""
+    return op.get_bind().execute(sa.text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {'name': name}).scalar()
+
+
+def _create_concurrently(name, table, columns, where=None):
+    state = _index_state(name)
+    if state:
+        return
+    if state is False:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+    op.execute(
+        f"CREATE INDEX CONCURRENTLY {name} ON {table} ({columns})"
+        + (f" WHERE {where}" if where else "")
+    )
+
+
+def _create_partitioned(name, columns):
+    """На секционированную таблицу CONCURRENTLY нельзя: индекс создаётся только на родителе (ON ONLY),
+    на каждой секции строится CONCURRENTLY и подключается к нему. Новые секции получат индекс при ATTACH."""
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY visit ({columns})")
+    partitions = op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'visit'::regclass ORDER BY c.relname"
+    )).scalars().all()
+    for partition in partitions:
+        partition_index = f"{partition}_{columns}_idx"
+        _create_concurrently(partition_index, partition, columns)
+        attached = op.get_bind().execute(sa.text(
+            "SELECT 1 FROM pg_inherits WHERE inhrelid = CAST(:child AS regclass) AND inhparent = CAST(:parent AS regclass)"
+        ), {'child': partition_index, 'parent': name}).scalar()
+        if not attached:
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
@@ -1,7 +1,11 @@
-from flask import Blueprint, request, jsonify
 from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+
 from database.engine import db
-from database.models.application import Application  # Импортируем вашу модель
+from database.models.work_order import NEW, WorkOrder  # Импортируем вашу модель
+from utils.health import check_database
+from utils.utc import utcnow
 
 mob_db = Blueprint('mobile', __name__, url_prefix='/api')
 
@@ -44,15 +48,15 @@ def create_application():
             }), 400
 
         # Создаем новую заявку в БД
-        new_application = Application(
+        new_application = WorkOrder(
             name=data['name'].strip(),
             phone=data['phone'].strip(),
             car_brand=data['carBrand'].strip(),
             car_model=data['carModel'].strip(),
             desired_date=date_obj,
             desired_time=time_obj,
-            status='Новая',
-            created_at=datetime.utcnow(),
+            status=NEW,
+            created_at=utcnow(),
             comment='Заявка из мобильного приложения'
         )
 
@@ -76,7 +80,7 @@ def create_application():
                 'car_model': new_application.car_model,
                 'date': new_application.desired_date.strftime('%Y-%m-%d'),
                 'time': new_application.desired_time.strftime('%H:%M'),
-                'status': new_application.status,
+                'status': new_application.status_label,
                 'created_at': new_application.created_at.strftime('%Y-%m-%d %H:%M:%S')
             }
         }), 201
@@ -91,15 +95,12 @@ def create_application():
 
 @mob_db.route('/applications/health', methods=['GET'])
 def health_check():
-    try:
-        # Проверяем подключение к БД
-        db.session.execute('SELECT 1')
-        db_status = 'connected'
-    except Exception as e:
-        db_status = f'error: {str(e)}'
+    # Проверяем подключение к БД (с таймаутом, см. HEALTH_DB_TIMEOUT)
+    ok, error, _ms = check_database()
+    db_status = 'connected' if ok else f'error: {error}'
 
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if ok else 'unhealthy',
         'service': 'mobile_api',
         'database': db_status,
         'timestamp': datetime.now().isoformat(),
@@ -107,7 +108,7 @@ def health_check():
             'POST /api/applications': 'Создание заявки',
             'GET /api/applications/health': 'Проверка здоровья'
         }
-    }), 200
+    }), 200 if ok else 503
 
 @mob_db.route('/applications/test', methods=['GET'])
 def test_route():
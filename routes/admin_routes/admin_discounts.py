@@ -1,18 +1,20 @@
 import os
 from datetime import date, datetime
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from flask import Blueprint, flash, redirect, url_for, request, render_template, jsonify
-from flask_login import login_required, current_user
+
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
 from flask_wtf import FlaskForm
 from sqlalchemy.sql.functions import current_date
 from werkzeug.utils import secure_filename
-from wtforms import StringField, TextAreaField, BooleanField, DateField
+from wtforms import BooleanField, DateField, StringField, TextAreaField
 from wtforms.validators import DataRequired
 
 from database.engine import db
 from database.models.discount import Discount
 from forms import DiscountForm
+from utils.cache_generation import generations
+from utils.discount_cache import GENERATION as DISCOUNTS
+from utils.upload_stream import discount_upload_folder, save_upload, streamed_upload
 
 admin_discounts_bp = Blueprint("admin_discounts", __name__, url_prefix="/admin/discounts")
 
@@ -28,6 +30,7 @@ current_date = date.today().isoformat()  # 'YYYY-MM-DD'
 
 @admin_discounts_bp.route('/admin/discounts', methods=['GET', 'POST'])
 @login_required
+@streamed_upload('image', back='admin_discounts.admin_discounts')
 def admin_discounts():
     if not current_user.is_admin:
         flash('Доступ запрещен', 'error')
@@ -53,15 +56,15 @@ def admin_discounts():
             if form.image.data:
                 try:
                     # Создаем папку если ее нет
-                    upload_folder = 'static/uploads/discounts'
+                    upload_folder = discount_upload_folder()
                     os.makedirs(upload_folder, exist_ok=True)
 
                     filename = secure_filename(form.image.data.filename)
                     unique_filename = f"{datetime.now().timestamp()}_{filename}"
                     filepath = os.path.join(upload_folder, unique_filename)
 
-                    # Сохраняем файл
-                    form.image.data.save(filepath)
+                    # Сохраняем файл: тело уже принято рядом во временный файл — только переносим
+                    save_upload(form.image.data, filepath)
                     discount.image = f"uploads/discounts/{unique_filename}"
 
                 except Exception as e:
@@ -70,6 +73,7 @@ def admin_discounts():
 
             try:
                 db.session.add(discount)
+                generations.bump(DISCOUNTS)
                 db.session.commit()
                 flash('Скидка успешно добавлена!', 'success')
                 return redirect(url_for('admin_discounts.admin_discounts'))
@@ -109,6 +113,7 @@ def delete_discount(id):
 
         # Удаляем из базы
         db.session.delete(discount)
+        generations.bump(DISCOUNTS)
         db.session.commit()
         flash('Скидка успешно удалена!', 'success')
 
@@ -179,6 +184,7 @@ def update_discount(id):
         expires_at = request.form.get('expires_at')
         discount.expires_at = datetime.strptime(expires_at, '%Y-%m-%d') if expires_at else None
 
+        generations.bump(DISCOUNTS)
         db.session.commit()
         flash('Скидка успешно обновлена!', 'success')
 
@@ -197,6 +203,8 @@ def cleanup_expired_discounts():
             Discount.expires_at < datetime.now()
         ).delete(synchronize_session=False)
 
+        if expired_count:
+            generations.bump(DISCOUNTS)
         db.session.commit()
         print(f"Удалено {expired_count} просроченных скидок")
         return expired_count
@@ -206,12 +214,4 @@ def cleanup_expired_discounts():
         return 0
 
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    func=cleanup_expired_discounts,
-    trigger=IntervalTrigger(hours=1),
-    id='cleanup_discounts',
-    name='Cleanup expired discounts',
-    replace_existing=True
-)
-scheduler.start()
\ No newline at end of file
+# Периодический запуск — в utils/scheduler.py
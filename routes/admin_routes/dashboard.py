@@ -1,10 +1,11 @@
-from flask import Blueprint, abort, render_template
-from flask_login import login_required, current_user
 from datetime import datetime
 
+from flask import Blueprint, abort, render_template
+from flask_login import current_user, login_required
+from sqlalchemy import func
 
-from database.models.application import Application
-from database.models.queue import Queue
+from database.engine import db
+from database.models.work_order import NEW, QUEUED, WorkOrder
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -17,13 +18,14 @@ def admin_dashboard():
     if not current_user.is_admin:
         abort(403)
 
-    # Получаем статистику
-    new_requests_count = Application.query.filter_by(status='new').count()
-    queue_count = Queue.query.count()
-    total_requests = Application.query.count()
+    # Получаем статистику — один GROUP BY по статусам заказов
+    by_status = dict(db.session.query(WorkOrder.status, func.count(WorkOrder.id)).group_by(WorkOrder.status).all())
+    new_requests_count = by_status.get(NEW, 0)
+    queue_count = by_status.get(QUEUED, 0)
+    total_requests = sum(by_status.values())
 
     # Получаем последние 5 заявок
-    recent_requests = Application.query.order_by(Application.created_at.desc()).limit(5).all()
+    recent_requests = WorkOrder.query.order_by(WorkOrder.created_at.desc()).limit(5).all()
 
     return render_template('admin_dashboard.html',
                            user=current_user,
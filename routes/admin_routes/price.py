@@ -3,14 +3,10 @@ from flask_login import login_required
 
 from admin_price import PriceForm
 from database.engine import db
-from database.models.servicePrice import ServicePrice
 from database.models.priceForm import PriceForm
-
-
-
-
-
-
+from database.models.servicePrice import ServicePrice
+from utils.cache_generation import generations
+from utils.price_cache import GENERATION as PRICES
 
 price_bp = Blueprint('admin_price', __name__, url_prefix='/admin/price')
 
@@ -38,6 +34,7 @@ def admin_price():
                 price=form.price.data
             )
             db.session.add(new_price)
+            generations.bump(PRICES)
             db.session.commit()
             flash('Услуга успешно добавлена!', 'success')
             return redirect(url_for('admin_price.admin_price'))
@@ -51,6 +48,7 @@ def admin_price():
 def delete_price(id):
     price = ServicePrice.query.get_or_404(id)  # Используйте имя модели ServicePrice
     db.session.delete(price)
+    generations.bump(PRICES)
     db.session.commit()
     flash('Услуга успешно удалена!', 'success')
     return redirect(url_for('admin_price.admin_price'))
@@ -60,6 +58,7 @@ def delete_price(id):
 def toggle_price(id):
     price = ServicePrice.query.get_or_404(id)
     price.is_active = not price.is_active
+    generations.bump(PRICES)
     db.session.commit()
     flash('Статус услуги изменен!', 'success')
     return redirect(url_for('admin_price.admin_price'))
@@ -72,6 +71,7 @@ def edit_price(id):
 
     if form.validate_on_submit():
         form.populate_obj(price)
+        generations.bump(PRICES)
         db.session.commit()
         flash('Цена успешно обновлена!', 'success')
         return redirect(url_for('admin_price.admin_price'))
@@ -1,14 +1,30 @@
-import os
-from datetime import datetime
-
-from flask import Blueprint, abort, render_template, flash, redirect, url_for, request, current_app
-from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename, send_from_directory
+from datetime import date, datetime, timedelta
+
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
+from flask_login import current_user, login_required
+from sqlalchemy import and_, case, exists, func, or_
 
 from database.engine import db
-from database.models.inService import InService
-from database.models.queue import Queue
+from database.models.work_comment import WorkComment
+from database.models.work_order import CANCELLED, IN_SERVICE, QUEUED, WorkOrder
 from utils.allowed_file import allowed_file
+from utils.estimate_preview import estimate_previews
+from utils.file_delivery import file_delivery
+from utils.pagination import keyset_page, page_size
+from utils.upload_store import store_upload
+from utils.upload_stream import streamed_upload
+from utils.work_comments import WORK_ORDER, add_comment, latest_comments
+from utils.work_orders import bulk_results, excel_download_name, parse_ids, transition
 
 queue_bp = Blueprint("admin_queue", __name__, url_prefix="/admin")
 
@@ -22,21 +38,122 @@ def view_queue():
 
     # Получаем параметр сортировки
     order = request.args.get('order', 'desc')  # по умолчанию новые записи сверху
-
-    # Сортировка по дате и времени записи
-    queue_entries = Queue.query
-    if order == 'asc':
-        queue_entries = queue_entries.order_by(Queue.desired_date.asc(), Queue.desired_time.asc())
-    else:
-        queue_entries = queue_entries.order_by(Queue.desired_date.desc(), Queue.desired_time.desc())
-
-    queue_entries = queue_entries.all()
+    if order not in ('asc', 'desc'):
+        order = 'desc'
+
+    # По умолчанию показываем окно today ± QUEUE_WINDOW_DAYS дней; за его пределы — ссылками "раньше/позже"
+    today = date.today()
+    days = int(current_app.config.get('QUEUE_WINDOW_DAYS', 7))
+    date_from = _parse_date(request.args.get('date_from')) or today - timedelta(days=days)
+    date_to = _parse_date(request.args.get('date_to')) or today + timedelta(days=days)
+    if date_to < date_from:
+        date_from, date_to = date_to, date_from
+
+    # Только заказы в очереди — запрос идёт по частичному индексу ix_work_order_queued
+    queued = WorkOrder.query.filter(WorkOrder.status == QUEUED)
+    query = queued.filter(WorkOrder.desired_date.between(date_from, date_to))
+
+    # Сортировка по дате и времени записи; id делает ключ уникальным
+    per_page = page_size(request.args.get('per_page'))
+    page = keyset_page(
+        query,
+        [WorkOrder.desired_date, WorkOrder.desired_time, WorkOrder.id],
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        descending=order == 'desc',
+        limit=per_page,
+    )
+
+    # Соседние окна той же ширины
+    span = date_to - date_from + timedelta(days=1)
+    window = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'earlier': {'date_from': (date_from - span).isoformat(), 'date_to': (date_from - timedelta(days=1)).isoformat()},
+        'later': {'date_from': (date_to + timedelta(days=1)).isoformat(), 'date_to': (date_to + span).isoformat()},
+    }
+
+    # Журнал комментариев только для строк этой страницы — одним запросом
+    comments = latest_comments(entry.id for entry in page.items)
+
+    # JSON-вариант для подгрузки строк в админке без перезагрузки страницы: данные строк
+    # и готовый HTML строк таблицы и их модальных окон (те же partials, что на странице)
+    if request.args.get('format') == 'json':
+        context = {'queue_entries': page.items, 'comments': comments, 'today': today}
+        return jsonify({
+            'items': [_queue_entry_json(entry, comments.get(entry.id, [])) for entry in page.items],
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            'rows_html': render_template('partials/queue_rows.html', **context),
+            'modals_html': render_template('partials/queue_modals.html', **context),
+        })
+
+    stats = _queue_stats(queued, date_from, date_to, today)
+    if stats['older']:
+        # Записи, которые всё ещё ждут в очереди с дат до окна, — ссылкой на их окно
+        window['older'] = {'date_from': stats['oldest'].isoformat(),
+                           'date_to': (date_from - timedelta(days=1)).isoformat()}
+    params = {'date_from': date_from.isoformat(), 'date_to': date_to.isoformat()}
+    if request.args.get('per_page'):
+        params['per_page'] = per_page
 
     # Функция для шаблона — меняет порядок сортировки при клике
     def next_order():
         return 'desc' if order == 'asc' else 'asc'
 
-    return render_template('admin_queue.html', queue_entries=queue_entries, user=current_user, next_order=next_order, current_order=order)
+    return render_template('admin_queue.html', queue_entries=page.items, page=page, stats=stats, comments=comments,
+                           window=window, params=params, today=today, user=current_user,
+                           next_order=next_order, current_order=order)
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _queue_stats(queued, date_from, date_to, today):
+    """Счётчики для карточек над таблицей по окну и число записей очереди с дат до окна
+    (older, самая ранняя дата — oldest) — одним запросом"""
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    in_window = WorkOrder.desired_date >= date_from
+    row = queued.filter(WorkOrder.desired_date <= date_to).order_by(None).with_entities(
+        count_if(in_window),
+        count_if(and_(in_window, WorkOrder.desired_date == today)),
+        count_if(and_(in_window, or_(
+            func.coalesce(func.trim(WorkOrder.comment), '') != '',
+            exists().where(WorkComment.entity_type == WORK_ORDER, WorkComment.entity_id == WorkOrder.id),
+        ))),
+        count_if(WorkOrder.desired_date < date_from),
+        func.min(WorkOrder.desired_date),
+    ).one()
+    return {'total': row[0], 'today': row[1], 'with_comment': row[2], 'older': row[3], 'oldest': row[4]}
+
+
+def _queue_entry_json(entry, comments):
+    return {
+        'id': entry.id,
+        'application_id': entry.id,  # заявка и запись в очереди теперь один заказ
+        'name': entry.name,
+        'phone': entry.phone,
+        'car_brand': entry.car_brand,
+        'car_model': entry.car_model,
+        'desired_date': entry.desired_date.isoformat(),
+        'desired_time': entry.desired_time.strftime('%H:%M'),
+        'status': entry.status,
+        'comment': entry.comment or '',
+        'created_at': entry.created_at.isoformat() if entry.created_at else None,
+        'queued_at': entry.queued_at.isoformat() if entry.queued_at else None,
+        'comments': [
+            {'author': c.author_name, 'created_at': c.created_at.isoformat(), 'body': c.body}
+            for c in comments
+        ],
+    }
 
 
 @queue_bp.route('/admin/queue/update/<int:queue_id>', methods=['POST'])
@@ -46,7 +163,7 @@ def update_queue(queue_id):
         abort(403)
 
     try:
-        queue_entry = Queue.query.get_or_404(queue_id)
+        queue_entry = WorkOrder.query.get_or_404(queue_id)
 
         # Обновляем данные
         queue_entry.name = request.form.get('name')
@@ -73,15 +190,11 @@ def add_queue_comment(queue_id):
         abort(403)
 
     try:
-        queue_entry = Queue.query.get_or_404(queue_id)
+        WorkOrder.query.get_or_404(queue_id)
         comment = request.form.get('comment', '').strip()
 
         if comment:
-            if queue_entry.comment:
-                queue_entry.comment += f"\n[{datetime.now().strftime('%d.%m.%Y %H:%M')}]: {comment}"
-            else:
-                queue_entry.comment = f"[{datetime.now().strftime('%d.%m.%Y %H:%M')}]: {comment}"
-
+            add_comment(queue_id, comment, author=current_user)
             db.session.commit()
             flash('Комментарий добавлен!', 'success')
         else:
@@ -95,80 +208,40 @@ def add_queue_comment(queue_id):
 
 @queue_bp.route('/admin/queue/to_service/<int:queue_id>', methods=['POST'])
 @login_required
+@streamed_upload('excel', back='admin_queue.view_queue')
 def move_to_service(queue_id):
     if not current_user.is_admin:
         abort(403)
 
     try:
-        queue_entry = Queue.query.get_or_404(queue_id)
+        WorkOrder.query.get_or_404(queue_id)
 
         # Обработка загрузки файла
-        excel_filename = None
+        excel_file = excel_name = None
         if 'excel_file' in request.files:
             file = request.files['excel_file']
             if file and file.filename and allowed_file(file.filename):
-                # Создаем безопасное имя файла
-                filename = secure_filename(file.filename)
-                # Добавляем timestamp для уникальности
-                import time
-                timestamp = str(int(time.time()))
-                name, ext = os.path.splitext(filename)
-                filename = f"{name}_{timestamp}{ext}"
-
-                # Сохраняем файл
-                file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
-                excel_filename = filename
-
-        # Достаём данные из формы
-        raw_cost = request.form.get('estimated_cost')
-        raw_date = request.form.get('estimated_completion')
-
-        # обработка стоимости
-        if not raw_cost or raw_cost.strip() == "":
-            estimated_cost = None
-        else:
-            try:
-                estimated_cost = float(raw_cost)
-            except ValueError:
-                estimated_cost = None  # если вдруг введут ерунду
-
-        # обработка даты
-        if not raw_date or raw_date.strip() == "":
-            estimated_completion = None
-        else:
-            try:
-                estimated_completion = datetime.strptime(raw_date, '%Y-%m-%d').date()
-            except ValueError:
-                estimated_completion = None
-
-        # Создаем запись в ремонте
-        service_entry = InService(
-            queue_id=queue_entry.id,
-            name=queue_entry.name,
-            phone=queue_entry.phone,
-            car_brand=queue_entry.car_brand,
-            car_model=queue_entry.car_model,
-            desired_date=queue_entry.desired_date,
-            desired_time=queue_entry.desired_time,
-            created_at=queue_entry.created_at,
-            comment=queue_entry.comment,
-            estimated_completion=estimated_completion,
-            estimated_cost=estimated_cost,
-            work_list=request.form.get('work_list', ''),
-            excel_file=excel_filename
-        )
-
-        # Добавляем в ремонт и удаляем из очереди
-        db.session.add(service_entry)
-        db.session.delete(queue_entry)
+                # Смета ложится в хранилище по содержимому: повторная загрузка того же файла места не занимает
+                excel_file = store_upload(file)
+                excel_name = file.filename
+
+        # Заказ переходит в ремонт одним UPDATE вместе с оценкой работ из формы
+        moved = transition(queue_id, IN_SERVICE, excel_file=excel_file, excel_name=excel_name, **_estimate(request.form))
+        if not moved:
+            # Заказ уже не в очереди (например, его перенёс другой админ); ссылка на смету откатывается
+            db.session.rollback()
+            flash('Запись уже не в очереди', 'warning')
+            return redirect(url_for('admin_queue.view_queue'))
         db.session.commit()
+        # Смета разбирается в фоне: превью на доске и итог в estimated_cost, если оценку не ввели
+        estimate_previews.submit(excel_file)
 
         flash('Автомобиль перемещен в ремонт!', 'success')
 
     except Exception as e:
         db.session.rollback()
         flash(f'Ошибка при перемещении в ремонт: {str(e)}', 'danger')
-        raise e
+        return redirect(url_for('admin_queue.view_queue'))
 
     return redirect(url_for('admin_service.view_service'))
 
@@ -180,10 +253,13 @@ def delete_queue(queue_id):
         abort(403)
 
     try:
-        queue_entry = Queue.query.get_or_404(queue_id)
-        db.session.delete(queue_entry)
-        db.session.commit()
-        flash('Запись из очереди удалена!', 'success')
+        WorkOrder.query.get_or_404(queue_id)
+        # Заказ не удаляется, а отменяется — история остаётся в work_order
+        if transition(queue_id, CANCELLED, from_statuses=(QUEUED,)):
+            db.session.commit()
+            flash('Запись из очереди удалена!', 'success')
+        else:
+            flash('Запись уже не в очереди', 'warning')
 
     except Exception as e:
         db.session.rollback()
@@ -192,17 +268,66 @@ def delete_queue(queue_id):
     return redirect(url_for('admin_queue.view_queue'))
 
 
-@queue_bp.route('/view/excel/<filename>')
+def _estimate(data):
+    """Оценка работ при переводе в ремонт: пустые и некорректные значения — None"""
+    raw_cost = data.get('estimated_cost')
+    raw_date = data.get('estimated_completion')
+
+    # обработка стоимости
+    try:
+        estimated_cost = float(raw_cost) if raw_cost is not None and str(raw_cost).strip() else None
+    except (TypeError, ValueError):
+        estimated_cost = None  # если вдруг введут ерунду
+
+    # обработка даты
+    try:
+        estimated_completion = datetime.strptime(str(raw_date).strip(), '%Y-%m-%d').date() if raw_date else None
+    except ValueError:
+        estimated_completion = None
+
+    return {
+        'estimated_completion': estimated_completion,
+        'estimated_cost': estimated_cost,
+        'work_list': data.get('work_list') or '',
+    }
+
+
+@queue_bp.route('/admin/queue/bulk', methods=['POST'])
+@login_required
+def bulk_queue():
+    """Массовое действие над очередью: {"action": "move" | "delete", "ids": [...]}.
+
+    "move" переводит записи в ремонт (общие estimated_completion, estimated_cost, work_list
+    можно передать в том же JSON), "delete" отменяет их. Один UPDATE на все id."""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Доступ запрещен'}), 403
+
+    payload = request.get_json(silent=True) or {}
+    action = payload.get('action')
+    if action not in ('move', 'delete'):
+        return jsonify({'success': False, 'error': f'Неизвестное действие: {action}'}), 400
+    try:
+        ids = parse_ids(payload)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        if action == 'move':
+            results = bulk_results(ids, transition(ids, IN_SERVICE, **_estimate(payload)), IN_SERVICE)
+        else:
+            results = bulk_results(ids, transition(ids, CANCELLED, from_statuses=(QUEUED,)), CANCELLED)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({'success': True, 'done': sum(r['ok'] for r in results), 'results': results})
+
+
+@queue_bp.route('/view/excel/<path:filename>')
 @login_required
 def view_excel(filename):
     if not current_user.is_admin:
         abort(403)
 
-    try:
-        return send_from_directory(
-            current_app.config['UPLOAD_FOLDER'],
-            filename,
-            as_attachment=False
-        )
-    except:
-        abort(404)
\ No newline at end of file
+    return file_delivery.send(current_app.config['UPLOAD_FOLDER'], filename, excel_download_name(filename))
\ No newline at end of file
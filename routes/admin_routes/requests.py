@@ -1,15 +1,32 @@
-from datetime import datetime
-
-from flask import Blueprint, abort, render_template, request, flash, redirect, url_for, Request
-from flask_login import login_required, current_user
+from datetime import date, datetime
+
+from flask import (
+    Blueprint,
+    Request,
+    abort,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
+from flask_login import current_user, login_required
+from sqlalchemy import case, func
 
 from database.engine import db
-from database.models.application import Application
-from database.models.queue import Queue
-
+from database.models.work_order import NEW, QUEUED, STATUS_LABELS, WorkOrder
+from utils.pagination import keyset_page, page_size
+from utils.upload_store import release
+from utils.work_comments import add_comment as log_comment
+from utils.work_comments import latest_comments
+from utils.work_orders import bulk_results, delete_orders, parse_ids, transition
 
 admin_required_bp = Blueprint("admin_required", __name__, url_prefix="/admin")
 
+# Статусы заказов для фильтра: значение -> подпись
+REQUEST_STATUSES = STATUS_LABELS
+
 
 
 
@@ -45,22 +62,75 @@ def requests():
 @login_required
 def view_requests():
     order = request.args.get('order', 'asc')
-
-    # Сортировка по дате и времени записи
-    requests_list = Application.query
-
-    if order == 'asc':
-        requests_list = requests_list.order_by(Application.desired_date.asc(), Application.desired_time.asc())
-    else:
-        requests_list = requests_list.order_by(Application.desired_date.desc(), Application.desired_time.desc())
-
-    requests_list = requests_list.all()
+    if order not in ('asc', 'desc'):
+        order = 'asc'
+
+    # Фильтры выполняются в БД, а не в шаблоне
+    filters = {
+        'status': request.args.get('status', '').strip(),
+        'car_brand': request.args.get('car_brand', '').strip(),
+        'date_from': _parse_date(request.args.get('date_from')),
+        'date_to': _parse_date(request.args.get('date_to')),
+    }
+    if filters['status'] not in REQUEST_STATUSES:
+        filters['status'] = ''
+    query = WorkOrder.query
+    if filters['status']:
+        query = query.filter(WorkOrder.status == filters['status'])
+    if filters['car_brand']:
+        query = query.filter(WorkOrder.car_brand.ilike(f"{filters['car_brand']}%"))
+    if filters['date_from']:
+        query = query.filter(WorkOrder.desired_date >= filters['date_from'])
+    if filters['date_to']:
+        query = query.filter(WorkOrder.desired_date <= filters['date_to'])
+
+    # Сортировка по дате и времени записи; id делает ключ уникальным
+    per_page = page_size(request.args.get('per_page'))
+    page = keyset_page(
+        query,
+        [WorkOrder.desired_date, WorkOrder.desired_time, WorkOrder.id],
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        descending=order == 'desc',
+        limit=per_page,
+    )
+
+    today = date.today()
+    stats = _request_stats(query, today)
+    # Журнал комментариев только для строк этой страницы — одним запросом
+    comments = latest_comments(entry.id for entry in page.items)
+
+    # Параметры, которые сохраняются при переходе по страницам и смене сортировки
+    params = {k: v for k, v in request.args.items() if k in ('status', 'car_brand', 'date_from', 'date_to', 'per_page') and v}
 
     # Функция для шаблона — определяет следующий порядок
     def next_order():
         return 'desc' if order == 'asc' else 'asc'
 
-    return render_template('admin_requests.html', requests=requests_list, next_order=next_order, current_order=order)
+    return render_template('admin_requests.html', requests=page.items, page=page, stats=stats, comments=comments,
+                           filters=filters, params=params, statuses=REQUEST_STATUSES, per_page=per_page,
+                           today=today, next_order=next_order, current_order=order)
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _request_stats(query, today):
+    """Счётчики для карточек над таблицей — одним запросом по всем отфильтрованным заявкам"""
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    row = query.order_by(None).with_entities(
+        func.count(WorkOrder.id),
+        count_if(WorkOrder.status == NEW),
+        count_if(WorkOrder.desired_date == today),
+        count_if(WorkOrder.status != NEW),
+    ).one()
+    return {'total': row[0], 'pending': row[1], 'today': row[2], 'processed': row[3]}
 
 @admin_required_bp.route('/admin/request/update/<int:request_id>', methods=['POST'])
 @login_required
@@ -69,7 +139,7 @@ def update_request(request_id):
         abort(403)
 
     try:
-        application = Application.query.get_or_404(request_id)
+        application = WorkOrder.query.get_or_404(request_id)
 
         # Обновляем данные
         application.name = request.form.get('name')
@@ -99,15 +169,11 @@ def add_comment(request_id):
         abort(403)
 
     try:
-        application = Application.query.get_or_404(request_id)
+        WorkOrder.query.get_or_404(request_id)
         comment = request.form.get('comment', '').strip()
 
         if comment:
-            if application.comment:
-                application.comment += f"\n[{datetime.now().strftime('%d.%m.%Y %H:%M')}]: {comment}"
-            else:
-                application.comment = f"[{datetime.now().strftime('%d.%m.%Y %H:%M')}]: {comment}"
-
+            log_comment(request_id, comment, author=current_user)
             db.session.commit()
             flash('Комментарий добавлен!', 'success')
         else:
@@ -126,25 +192,11 @@ def confirm_request(request_id):
         abort(403)
 
     try:
-        application = Application.query.get_or_404(request_id)
-        application.status = "Обработана"
-
-        # Создаем запись в очереди
-        queue_entry = Queue(
-            application_id=application.id,
-            name=application.name,
-            phone=application.phone,
-            car_brand=application.car_brand,
-            car_model=application.car_model,
-            desired_date=application.desired_date,
-            desired_time=application.desired_time,
-            created_at=application.created_at,
-            comment=application.comment,
-            status='in_queue'
-        )
-
-        # Добавляем в очередь и удаляем из заявок
-        db.session.add(queue_entry)
+        # Заявка становится записью в очереди одним UPDATE — строка не копируется
+        if not transition(request_id, QUEUED):
+            WorkOrder.query.get_or_404(request_id)
+            flash('Заявка уже обработана', 'warning')
+            return redirect(url_for('admin_required.view_requests'))
         db.session.commit()
 
         flash('Заявка перемещена в очередь!', 'success')
@@ -162,8 +214,13 @@ def delete_request(request_id):
         abort(403)
 
     try:
-        application = Application.query.get_or_404(request_id)
-        db.session.delete(application)
+        WorkOrder.query.get_or_404(request_id)
+        files = delete_orders([request_id])
+        if not files:
+            # Заказ уже в работе или выполнен — его можно только отменить, история остаётся
+            flash('Удалить можно только новую или отменённую заявку', 'warning')
+            return redirect(url_for('admin_required.view_requests'))
+        release(files.values())
         db.session.commit()
         flash('Заявка удалена!', 'success')
 
@@ -171,4 +228,40 @@ def delete_request(request_id):
         db.session.rollback()
         flash(f'Ошибка при удалении заявки: {str(e)}', 'danger')
 
-    return redirect(url_for('admin_required.view_requests'))
\ No newline at end of file
+    return redirect(url_for('admin_required.view_requests'))
+
+
+@admin_required_bp.route('/admin/requests/bulk', methods=['POST'])
+@login_required
+def bulk_requests():
+    """Массовое действие над заявками: {"action": "confirm" | "delete", "ids": [...]}.
+
+    Одна транзакция и один UPDATE/DELETE на все id; ответ — результат по каждому id.
+    delete удаляет только новые и отменённые заказы, остальные приходят как wrong_status."""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Доступ запрещен'}), 403
+
+    payload = request.get_json(silent=True) or {}
+    action = payload.get('action')
+    if action not in ('confirm', 'delete'):
+        return jsonify({'success': False, 'error': f'Неизвестное действие: {action}'}), 400
+    try:
+        ids = parse_ids(payload)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    files = {}
+    try:
+        if action == 'confirm':
+            results = bulk_results(ids, transition(ids, QUEUED), QUEUED)
+        else:
+            files = delete_orders(ids)
+            release(files.values())
+            results = bulk_results(ids, files, 'deleted')
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({'success': True, 'done': sum(r['ok'] for r in results), 'results': results})
+
@@ -1,14 +1,34 @@
-import os
-from datetime import datetime
-
-from flask import Blueprint, abort, render_template, request
-from flask import current_app
-from flask import send_from_directory
-from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename, redirect
+from datetime import date, datetime, timedelta
+
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
+from flask_login import current_user, login_required
+from sqlalchemy import case, func
 
 from database.engine import db
+from database.models.work_order import CANCELLED, COMPLETED, IN_SERVICE, WorkOrder
 from utils.allowed_file import allowed_file
+from utils.estimate_preview import estimate_previews
+from utils.file_delivery import file_delivery
+from utils.upload_store import release, store_upload
+from utils.upload_stream import streamed_upload
+from utils.work_comments import latest_comments
+from utils.work_orders import (
+    bulk_results,
+    excel_download_name,
+    excel_files,
+    parse_ids,
+    transition,
+)
 
 service_bp = Blueprint('admin_service', __name__, url_prefix='/admin/service')
 
@@ -25,44 +45,92 @@ def view_service():
     if not current_user.is_admin:
         abort(403)
 
-    # Получаем все записи в ремонте
-    service_entries = InService.query.order_by(InService.moved_at.desc()).all()
+    today = date.today()
+    conditions = _bucket_conditions(today)
+    selected = request.args.get('filter', 'all')
+    if selected not in conditions:
+        selected = 'all'
+
+    # Счётчики по всем фильтрам — одним сгруппированным запросом
+    counts, with_excel = _bucket_counts(today)
+
+    # Получаем записи в ремонте только из выбранной группы
+    query = WorkOrder.query.filter(WorkOrder.status == IN_SERVICE)
+    if selected != 'all':
+        query = query.filter(conditions[selected])
+    service_entries = query.order_by(WorkOrder.service_started_at.desc()).all()
+    comments = latest_comments(entry.id for entry in service_entries)
+    # Превью смет — из кэша и stored_files.preview, файлы не открываются
+    previews = estimate_previews.for_paths(entry.excel_file for entry in service_entries)
+
     return render_template('admin_service.html',
                            service_entries=service_entries,
+                           comments=comments,
+                           previews=previews,
+                           counts=counts,
+                           with_excel=with_excel,
+                           selected_filter=selected,
+                           filters=SERVICE_FILTERS,
+                           today=today,
                            user=current_user)
 
+
+# Фильтры доски ремонта по сроку окончания работ
+SERVICE_FILTERS = {
+    'all': 'Все автомобили',
+    'week': 'Заканчиваются на этой неделе',
+    'overdue': 'Просроченные',
+    'no-date': 'Без даты окончания',
+}
+
+
+def _bucket_conditions(today):
+    """SQL-условия фильтров по estimated_completion (частичный индекс ix_work_order_in_service)"""
+    return {
+        'all': None,
+        'overdue': WorkOrder.estimated_completion < today,
+        'week': WorkOrder.estimated_completion.between(today, today + timedelta(days=7)),
+        'no-date': WorkOrder.estimated_completion.is_(None),
+    }
+
+
+def _bucket_counts(today):
+    bucket = case(
+        (WorkOrder.estimated_completion.is_(None), 'no-date'),
+        (WorkOrder.estimated_completion < today, 'overdue'),
+        (WorkOrder.estimated_completion <= today + timedelta(days=7), 'week'),
+        else_='later',
+    ).label('bucket')
+    rows = (db.session.query(bucket, func.count(WorkOrder.id), func.count(WorkOrder.excel_file))
+            .filter(WorkOrder.status == IN_SERVICE).group_by(bucket).all())
+
+    counts = {key: 0 for key in ('all', 'week', 'overdue', 'no-date', 'later')}
+    with_excel = 0
+    for name, count, excel in rows:
+        counts[name] = count
+        counts['all'] += count
+        with_excel += excel
+    return counts, with_excel
+
 @service_bp.route('/admin/service/update/<int:service_id>', methods=['POST'])
 @login_required
+@streamed_upload('excel', back='admin_service.view_service')
 def update_service(service_id, conf=None):
     if not current_user.is_admin:
         abort(403)
 
+    old_file = new_file = None
     try:
-        service_entry = InService.query.get_or_404(service_id)
+        service_entry = WorkOrder.query.get_or_404(service_id)
 
         # Обработка загрузки нового файла
         if 'excel_file' in request.files:
             file = request.files['excel_file']
             if file and file.filename and allowed_file(file.filename):
-                # Удаляем старый файл, если он есть
-                if service_entry.excel_file:
-                    try:
-                        os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], service_entry.excel_file))
-                    except:
-                        pass
-
-                # Создаем безопасное имя файла
-
-                # Создаем безопасное имя файла
-                filename = secure_filename(file.filename)
-                import time
-                timestamp = str(int(time.time()))
-                name, ext = os.path.splitext(filename)
-                filename = f"{name}_{timestamp}{ext}"
-
-                # Сохраняем новый файл
-                file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
-                service_entry.excel_file = filename
+                # Новая смета — в хранилище (тот же файл повторно не занимает место)
+                old_file = service_entry.excel_file
+                new_file = service_entry.excel_file = store_upload(file)
+                service_entry.excel_name = file.filename
 
 
 # Обновляем данные
@@ -71,11 +139,18 @@ def update_service(service_id, conf=None):
         service_entry.car_brand = request.form.get('car_brand')
         service_entry.car_model = request.form.get('car_model')
         service_entry.estimated_completion = datetime.strptime(request.form.get('estimated_completion'), '%Y-%m-%d').date() if request.form.get('estimated_completion') else None
-        service_entry.estimated_cost = request.form.get('estimated_cost', '')
+        # Пустая стоимость — None: её подставит итог из сметы
+        service_entry.estimated_cost = _cost(request.form.get('estimated_cost'))
         service_entry.comment = request.form.get('comment', '')
         service_entry.work_list = request.form.get('work_list', '')
 
+        # Ссылка со старой сметы снимается в той же транзакции: при откате она вернётся,
+        # а файл без ссылок потом уберёт сборщик мусора
+        db.session.flush()
+        if old_file:
+            release([old_file])
         db.session.commit()
+        estimate_previews.submit(new_file)
         flash('Запись в ремонте успешно обновлена!', 'success')
 
     except Exception as e:
@@ -85,6 +160,13 @@ def update_service(service_id, conf=None):
     return redirect(url_for('admin_service.view_service'))
 
 
+def _cost(raw):
+    try:
+        return float(str(raw).replace(' ', '').replace(',', '.')) if raw and str(raw).strip() else None
+    except ValueError:
+        return None
+
+
 
 
 
@@ -96,18 +178,16 @@ def delete_service(service_id):
         abort(403)
 
     try:
-        service_entry = InService.query.get_or_404(service_id)
+        WorkOrder.query.get_or_404(service_id)
+        files = excel_files([service_id], (IN_SERVICE,))
 
-        # Удаляем файл, если он есть
-        if service_entry.excel_file:
-            try:
-                os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], service_entry.excel_file))
-            except:
-                pass
-
-        db.session.delete(service_entry)
-        db.session.commit()
-        flash('Запись из ремонта удалена!', 'success')
+        # Заказ отменяется, а не удаляется; смета отменённого заказа больше не нужна
+        if transition(service_id, CANCELLED, from_statuses=(IN_SERVICE,), excel_file=None, excel_name=None):
+            release(files.values())
+            db.session.commit()
+            flash('Запись из ремонта удалена!', 'success')
+        else:
+            flash('Запись уже не в ремонте', 'warning')
 
     except Exception as e:
         db.session.rollback()
@@ -116,45 +196,20 @@ def delete_service(service_id):
     return redirect(url_for('admin_service.view_service'))
 
 
-from database.models.inService import InService
-from database.models.completed_service import CompletedService
-from flask import redirect, url_for, flash
-
 @service_bp.route('/complete/<int:id>', methods=['POST'])
 @login_required
 def complete_service(id):
-    service = InService.query.get_or_404(id)
+    if not current_user.is_admin:
+        abort(403)
+
+    WorkOrder.query.get_or_404(id)
 
-    # Приведение стоимости к числу
-    estimated_cost = service.estimated_cost
-    if estimated_cost == '' or estimated_cost is None:
-        estimated_cost = None
+    # Заказ уходит в архив одним UPDATE: comment и work_list не переписываются
+    if transition(id, COMPLETED):
+        db.session.commit()
+        flash('Услуга успешно завершена и перенесена в архив', 'success')
     else:
-        estimated_cost = float(estimated_cost)
-
-    # Создаём копию в CompletedService
-    completed = CompletedService(
-        queue_id=service.queue_id,
-        name=service.name,
-        phone=service.phone,
-        car_brand=service.car_brand,
-        car_model=service.car_model,
-        desired_date=service.desired_date,
-        desired_time=service.desired_time,
-        created_at=service.created_at,
-        estimated_completion=service.estimated_completion,
-        estimated_cost=estimated_cost,
-        comment=service.comment,
-        work_list=service.work_list,
-        excel_file=service.excel_file,
-        moved_at=datetime.utcnow()
-    )
-
-    db.session.add(completed)
-    db.session.delete(service)
-    db.session.commit()
-
-    flash('Услуга успешно завершена и перенесена в архив', 'success')
+        flash('Запись уже не в ремонте', 'warning')
 
     return redirect(url_for('admin_service.view_service'))
 
@@ -167,8 +222,46 @@ def complete_service(id):
 
 
 
+@service_bp.route('/admin/service/bulk', methods=['POST'])
+@login_required
+def bulk_service():
+    """Массовое действие над ремонтом: {"action": "complete" | "delete", "ids": [...]}.
+
+    Один UPDATE на все id; у отменённых заказов удаляются файлы смет."""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Доступ запрещен'}), 403
+
+    payload = request.get_json(silent=True) or {}
+    action = payload.get('action')
+    if action not in ('complete', 'delete'):
+        return jsonify({'success': False, 'error': f'Неизвестное действие: {action}'}), 400
+    try:
+        ids = parse_ids(payload)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        if action == 'complete':
+            results = bulk_results(ids, transition(ids, COMPLETED), COMPLETED)
+        else:
+            files = excel_files(ids, (IN_SERVICE,))
+            cancelled = transition(ids, CANCELLED, from_statuses=(IN_SERVICE,), excel_file=None, excel_name=None)
+            release(files.values())
+            results = bulk_results(ids, cancelled, CANCELLED)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({'success': True, 'done': sum(r['ok'] for r in results), 'results': results})
+
+
 @service_bp.route('/admin/view/excel/<path:filename>')
 @login_required
 def view_excel(filename):
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, as_attachment=False)
+    if not current_user.is_admin:
+        abort(403)
+
+    # Права проверены — дальше файл отдаёт выбранный способ доставки (см. FILE_DELIVERY_BACKEND)
+    return file_delivery.send(current_app.config['UPLOAD_FOLDER'], filename, excel_download_name(filename))
 
@@ -1,77 +1,60 @@
-from flask import Blueprint, request, render_template
+from datetime import UTC, datetime
+
+from flask import Blueprint, render_template, request
 from flask_login import current_user, login_required
-from datetime import datetime, date
-from database.models.visit import Visit
+from sqlalchemy import case, func
+
 from database.engine import db
+from database.models.visit import Visit
+from database.models.visit_rollup import VisitDailyRollup
+from utils.visit_buffer import visit_buffer
+from utils.visit_policy import visit_policy
 
 visit_bp = Blueprint("visit", __name__, url_prefix="/admin/visit")
 
 @visit_bp.before_app_request
 def log_visit():
-    today = datetime.utcnow().date()
+    # Статика, служебные и AJAX-запросы, боты не считаются визитами
+    if not visit_policy.should_track(request):
+        return
 
-    if current_user.is_authenticated:
-        # Проверяем по user_id
-        existing_visit = Visit.query.filter_by(
-            user_id=current_user.id,
-            date=today
-        ).first()
-        if not existing_visit:
-            new_visit = Visit(
-                user_id=current_user.id,
-                ip=request.remote_addr,
-                user_agent=request.headers.get("User-Agent"),
-                date=today
-            )
-            db.session.add(new_visit)
-            db.session.commit()
-    else:
-        # Проверяем по ip + user_agent
-        existing_visit = Visit.query.filter_by(
-            ip=request.remote_addr,
-            user_agent=request.headers.get("User-Agent"),
-            date=today
-        ).first()
-        if not existing_visit:
-            new_visit = Visit(
-                user_id=None,
-                ip=request.remote_addr,
-                user_agent=request.headers.get("User-Agent"),
-                date=today
-            )
-            db.session.add(new_visit)
-            db.session.commit()
+    # Визит только кладётся в буфер, в БД его пачкой запишет фоновый поток
+    visit_buffer.add(
+        user_id=current_user.id if current_user.is_authenticated else None,
+        ip=request.remote_addr,
+        user_agent=request.headers.get("User-Agent"),
+        day=datetime.now(UTC).date(),
+    )
 
 
-@visit_bp.route("/", endpoint="stats")
+@visit_bp.route("/admin/visit", endpoint="stats")
 @login_required
 def stats():
     if not current_user.is_admin:
         return "Доступ запрещён", 403
 
-    today = date.today()
-    now = datetime.now()
+    # Визиты хранятся по дате UTC
+    today = datetime.now(UTC).date()
+    first_of_month = today.replace(day=1)
+    first_of_year = today.replace(month=1, day=1)
 
-    # Счётчики
-    count_day = Visit.query.filter_by(date=today).count()
-
-    first_of_month = date(now.year, now.month, 1)
-    count_month = Visit.query.filter(
-        Visit.date >= first_of_month, Visit.date <= today
-    ).count()
-
-    first_of_year = date(now.year, 1, 1)
-    count_year = Visit.query.filter(
-        Visit.date >= first_of_year, Visit.date <= today
-    ).count()
-
-    count_day_guests = Visit.query.filter_by(date=today, user_id=None).count()
-    count_day_users = Visit.query.filter(
-        Visit.date == today, Visit.user_id != None
-    ).count()
+    # Все счётчики — одним запросом по дневной сводке (не больше 366 строк)
+    R = VisitDailyRollup
+    counters = db.session.query(
+        func.coalesce(func.sum(case((R.date == today, R.total), else_=0)), 0),
+        func.coalesce(func.sum(case((R.date >= first_of_month, R.total), else_=0)), 0),
+        func.coalesce(func.sum(R.total), 0),
+        func.coalesce(func.sum(case((R.date == today, R.guests), else_=0)), 0),
+        func.coalesce(func.sum(case((R.date == today, R.users), else_=0)), 0),
+    ).filter(R.date >= first_of_year, R.date <= today).one()
+    count_day, count_month, count_year, count_day_guests, count_day_users = (int(c) for c in counters)
 
     visits = Visit.query.order_by(Visit.date.desc()).limit(50).all()
 
+    # Уникальные посетители — оценка HyperLogLog из дневной сводки (все процессы), без COUNT по таблице
+    unique_today = visit_buffer.unique_visitors(today, today)
+    unique_month = visit_buffer.unique_visitors(first_of_month, today)
+
     return render_template(
         "visit_stats.html",
         count_day=count_day,
@@ -79,5 +62,9 @@ def stats():
         count_year=count_year,
         count_day_guests=count_day_guests,
         count_day_users=count_day_users,
-        visits=visits
+        unique_today=unique_today,
+        unique_month=unique_month,
+        traffic_counters=visit_policy.counters(),
+        visits=visits,
+        last_visits=visits
     )
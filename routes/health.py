@@ -0,0 +1,42 @@
+import hmac
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from flask_login import current_user
+
+from utils.health import check_database
+from utils.metrics import metrics
+
+# Служебные эндпоинты без префикса /service: пробы балансировщика/оркестратора и метрики
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route('/healthz')
+def healthz():
+    # Живость: процесс отвечает. БД здесь не проверяется — иначе её сбой перезапускал бы все воркеры
+    return jsonify({'status': 'ok'}), 200
+
+
+@health_bp.route('/readyz')
+def readyz():
+    # Готовность: БД отвечает за HEALTH_DB_TIMEOUT, иначе 503 — трафик уводится с этого экземпляра
+    ok, error, ms = check_database()
+    body = {'status': 'ok' if ok else 'error', 'database': 'connected' if ok else f'error: {error}', 'db_ms': ms}
+    return jsonify(body), 200 if ok else 503
+
+
+@health_bp.route('/metrics')
+def metrics_endpoint():
+    # Внутренний эндпоинт: по токену, с адресов METRICS_ALLOWED_IPS или для админа
+    if not _metrics_allowed():
+        abort(403)
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _metrics_allowed():
+    token = current_app.config.get('METRICS_TOKEN')
+    auth = request.headers.get('Authorization', '')
+    if token and auth.startswith('Bearer ') and hmac.compare_digest(auth[len('Bearer '):].strip(), token):
+        return True
+    if request.remote_addr in current_app.config.get('METRICS_ALLOWED_IPS', []):
+        return True
+    return current_user.is_authenticated and current_user.is_admin
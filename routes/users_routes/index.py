@@ -1,16 +1,19 @@
 from datetime import datetime
-from flask import render_template, Blueprint, request, jsonify
+
+from flask import Blueprint, jsonify, render_template, request
 from flask_login import current_user
 
 from database.engine import db
-from database.models.application import Application
-from database.models.discount import Discount
-from database.models.servicePrice import ServicePrice
+from database.models.work_order import WorkOrder
+from utils.discount_cache import discount_cache
+from utils.page_cache import cached_page
+from utils.price_cache import price_list_cache
 
 index_route = Blueprint('index', __name__, template_folder='../../templates')
 
 
 @index_route.route('/')
+@cached_page
 def index():
     return render_template("index.html")
 
@@ -26,7 +29,7 @@ def submit_application():
             desired_date = datetime.strptime(request.form['date'], '%Y-%m-%d').date()
             desired_time = datetime.strptime(request.form['time'], '%H:%M').time()
 
-            new_application = Application(
+            new_application = WorkOrder(
                 name=name,
                 phone=phone,
                 car_brand=car_brand,
@@ -46,26 +49,23 @@ def submit_application():
 
 
 @index_route.route('/about', endpoint='about')
+@cached_page
 def about():
     return render_template('about.html')
 
 
 @index_route.route('/contacts', endpoint='contacts')
+@cached_page
 def contacts():
     return render_template('contacts.html')
 
 
 @index_route.route('/discounts', endpoint='discounts')
 def discounts():
-    active_discounts = Discount.query.filter(
-        Discount.is_active == True,
-        (Discount.expires_at.is_(None)) | (Discount.expires_at >= datetime.now())
-    ).order_by(Discount.created_at.desc()).all()
-
+    active_discounts = discount_cache.active()
     return render_template('discounts.html', discounts=active_discounts, user=current_user)
 
 
 @index_route.route('/price', endpoint='price')
 def price():
-    active_prices = ServicePrice.query.filter_by(is_active=True).order_by(ServicePrice.service_name).all()
-    return render_template('price.html', prices=active_prices)
+    return price_list_cache.response()
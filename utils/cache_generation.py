@@ -0,0 +1,55 @@
+import threading
+import time
+
+from database.dialect import insert
+from database.engine import db
+from database.models.cache_generation import CacheGeneration
+from utils.utc import utcnow
+
+
+class CacheGenerations:
+    """Счётчики поколений кэшей в таблице cache_generation.
+
+    Админка увеличивает счётчик в той же транзакции, что и правку данных; каждый
+    процесс перечитывает его не чаще раза в check_interval секунд и, увидев новый
+    номер, выбрасывает свой кэш."""
+
+    def __init__(self):
+        self.check_interval = 2.0
+        self._known = {}        # имя -> (поколение, время изменения, когда проверяли)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.check_interval = float(app.config.get('CACHE_GENERATION_CHECK_INTERVAL', self.check_interval))
+        app.extensions['cache_generations'] = self
+
+    def current(self, name):
+        """(поколение, время последнего изменения) — для ещё не менявшихся данных (0, None)"""
+        now = time.monotonic()
+        with self._lock:
+            known = self._known.get(name)
+        if known is not None and now - known[2] < self.check_interval:
+            return known[0], known[1]
+
+        row = db.session.get(CacheGeneration, name, populate_existing=True)
+        generation, updated_at = (row.generation, row.updated_at) if row else (0, None)
+        with self._lock:
+            self._known[name] = (generation, updated_at, now)
+        return generation, updated_at
+
+    def bump(self, name):
+        """Сдвигает поколение; коммит — за вызывающим, вместе с самой правкой"""
+        now = utcnow()
+        table = CacheGeneration.__table__
+        stmt = insert(table).values(name=name, generation=1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={'generation': table.c.generation + 1, 'updated_at': now},
+        )
+        db.session.execute(stmt)
+        # Свой процесс должен увидеть изменение сразу, не дожидаясь check_interval
+        with self._lock:
+            self._known.pop(name, None)
+
+
+generations = CacheGenerations()
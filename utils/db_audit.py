@@ -0,0 +1,207 @@
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import case, func, select, text
+
+from database.engine import db
+from database.models.discount import Discount
+from database.models.servicePrice import ServicePrice
+from database.models.user import User
+from database.models.visit import Visit
+from database.models.visit_rollup import VisitDailyRollup
+from database.models.work_comment import WorkComment
+from database.models.work_order import COMPLETED, IN_SERVICE, NEW, QUEUED, WorkOrder
+
+# Синтетические данные для аудита: вставляются в той же транзакции, что и EXPLAIN, и откатываются
+SEED_SQL = [
+    """
+    INSERT INTO work_order (status, name, phone, car_brand, car_model, desired_date, desired_time,
+                            comment, work_list, estimated_completion, created_at, queued_at,
+                            service_started_at, completed_at, cancelled_at)
+    SELECT s.status::work_order_status, 'Audit ' || i, '+7900' || lpad(i::text, 7, '0'),
+           (ARRAY['VW', 'BMW', 'Audi', 'Lada', 'Kia'])[i % 5 + 1], 'Model', current_date + (i % 120 - 60),
+           make_time(8 + i % 10, (i % 4) * 15, 0), '', '',
+           CASE WHEN s.status IN ('in_service', 'completed') THEN current_date + (i % 30 - 10) END,
+           now() - i * interval '1 minute',
+           CASE WHEN s.status <> 'new' THEN now() - i * interval '1 minute' END,
+           CASE WHEN s.status IN ('in_service', 'completed') THEN now() - i * interval '1 minute' END,
+           CASE WHEN s.status = 'completed' THEN now() - i * interval '1 minute' END,
+           CASE WHEN s.status = 'cancelled' THEN now() - i * interval '1 minute' END
+    FROM generate_series(1, :rows) AS i,
+         LATERAL (SELECT (ARRAY['new', 'new', 'queued', 'queued', 'in_service',
+                                'completed', 'completed', 'completed', 'completed', 'cancelled'])[i % 10 + 1] AS status) s
+    """,
+    """
+    INSERT INTO work_comments (entity_type, entity_id, created_at, body)
+    SELECT 'work_order', w.id, w.created_at + c * interval '1 hour', 'audit comment ' || c
+    FROM (SELECT id, created_at FROM work_order ORDER BY id DESC LIMIT :rows) w, generate_series(1, 3) AS c
+    """,
+    """
+    INSERT INTO service_prices (service_name, description, price, is_active, created_at)
+    SELECT 'Audit service ' || i, '', 1000 + i, i % 4 <> 0, now()
+    FROM generate_series(1, GREATEST(:rows / 10, 1)) AS i
+    """,
+    """
+    INSERT INTO discounts (title, description, image, is_active, created_at, expires_at)
+    SELECT 'Audit discount ' || i, '', '', i % 3 <> 0, now() - i * interval '1 hour',
+           CASE WHEN i % 2 = 0 THEN now() + (i % 60 - 30) * interval '1 day' END
+    FROM generate_series(1, GREATEST(:rows / 10, 1)) AS i
+    """,
+    """
+    INSERT INTO "user" (first_name, last_name, phone, password, is_admin)
+    SELECT 'Audit', 'User', '+7911' || lpad(i::text, 7, '0'), '', false
+    FROM generate_series(1, GREATEST(:rows / 10, 1)) AS i
+    """,
+]
+
+# Визиты пишутся только в существующую секцию текущего месяца
+SEED_VISITS_SQL = [
+    "INSERT INTO user_agents (hash, value) VALUES ('db-audit', 'db-audit') ON CONFLICT (hash) DO NOTHING",
+    """
+    INSERT INTO visit (user_id, ip, ua_id, date)
+    SELECT NULL, '10.' || (i / 65536) % 256 || '.' || (i / 256) % 256 || '.' || i % 256,
+           (SELECT id FROM user_agents WHERE hash = 'db-audit'), current_date - (i % 3)
+    FROM generate_series(1, :rows) AS i
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+SEED_TABLES = ['work_order', 'work_comments', 'service_prices', 'discounts', '"user"', 'user_agents', 'visit']
+
+
+def audit_queries(today=None):
+    """Запросы, которые выполняют страницы и API: (название, запрос, полный проход ожидаем).
+
+    Третий элемент — True для запросов, которым нужна вся таблица (счётчики по всем строкам,
+    полный список): Seq Scan для них не ошибка."""
+    today = today or date.today()
+    page = 51   # page_size() + 1 строка — проверка следующей страницы
+    order_key = (WorkOrder.desired_date, WorkOrder.desired_time, WorkOrder.id)
+
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    bucket = case(
+        (WorkOrder.estimated_completion.is_(None), 'no-date'),
+        (WorkOrder.estimated_completion < today, 'overdue'),
+        (WorkOrder.estimated_completion <= today + timedelta(days=7), 'week'),
+        else_='later',
+    )
+    ranked = (
+        select(WorkComment.id, func.row_number().over(
+            partition_by=WorkComment.entity_id,
+            order_by=(WorkComment.created_at.desc(), WorkComment.id.desc()),
+        ).label('rank'))
+        .where(WorkComment.entity_type == 'work_order',
+               WorkComment.entity_id.in_(select(WorkOrder.id).order_by(WorkOrder.id.desc()).limit(50).scalar_subquery()))
+        .subquery()
+    )
+
+    return [
+        ('Заявки: новые, первая страница',
+         select(WorkOrder).where(WorkOrder.status == NEW).order_by(*order_key).limit(page), False),
+        ('Заявки: все статусы, первая страница',
+         select(WorkOrder).order_by(*order_key).limit(page), False),
+        ('Заявки: счётчики по фильтру дат',
+         select(func.count(WorkOrder.id), count_if(WorkOrder.status == NEW), count_if(WorkOrder.desired_date == today))
+         .where(WorkOrder.desired_date.between(today - timedelta(days=7), today + timedelta(days=7))), False),
+        ('Очередь: окно дат, первая страница',
+         select(WorkOrder).where(WorkOrder.status == QUEUED,
+                                 WorkOrder.desired_date.between(today - timedelta(days=7), today + timedelta(days=7)))
+         .order_by(*order_key).limit(page), False),
+        ('Ремонт: доска',
+         select(WorkOrder).where(WorkOrder.status == IN_SERVICE).order_by(WorkOrder.service_started_at.desc()), False),
+        ('Ремонт: просроченные',
+         select(WorkOrder).where(WorkOrder.status == IN_SERVICE, WorkOrder.estimated_completion < today), False),
+        ('Ремонт: счётчики групп',
+         select(bucket, func.count(WorkOrder.id)).where(WorkOrder.status == IN_SERVICE).group_by(bucket), False),
+        ('Архив: выполненные за месяц',
+         select(WorkOrder).where(WorkOrder.status == COMPLETED,
+                                 WorkOrder.completed_at >= today - timedelta(days=30)), False),
+        ('Панель: заказы по статусам',
+         select(WorkOrder.status, func.count(WorkOrder.id)).group_by(WorkOrder.status), True),
+        ('Панель: последние заявки',
+         select(WorkOrder).order_by(WorkOrder.created_at.desc()).limit(5), False),
+        ('Комментарии: последние 3 на строку',
+         select(WorkComment).join(ranked, ranked.c.id == WorkComment.id).where(ranked.c.rank <= 3), False),
+        ('Прайс: активные услуги',
+         select(ServicePrice).where(ServicePrice.is_active.is_(True)).order_by(ServicePrice.service_name), True),
+        ('Прайс: поиск по названию',
+         select(ServicePrice).where(ServicePrice.service_name == 'Audit service 1').limit(1), False),
+        ('Скидки: действующие',
+         select(Discount).where(Discount.is_active.is_(True),
+                                Discount.expires_at.is_(None) | (Discount.expires_at >= func.now()))
+         .order_by(Discount.created_at.desc()), True),
+        ('Скидки: просроченные',
+         select(func.count(Discount.id)).where(Discount.expires_at.isnot(None), Discount.expires_at < func.now()), False),
+        ('Визиты: последние 50',
+         select(Visit.id, Visit.date, Visit.ip).order_by(Visit.date.desc()).limit(50), False),
+        ('Визиты: сводка за год',
+         select(func.sum(VisitDailyRollup.total))
+         .where(VisitDailyRollup.date >= date(today.year, 1, 1), VisitDailyRollup.date <= today), False),
+        ('Вход: пользователь по телефону',
+         select(User).where(User.phone == '+79110000001').limit(1), False),
+    ]
+
+
+def seed(conn, rows):
+    """Заполняет горячие таблицы синтетическими строками и обновляет статистику планировщика"""
+    for sql in SEED_SQL:
+        conn.execute(text(sql), {'rows': rows})
+    savepoint = conn.begin_nested()
+    try:
+        for sql in SEED_VISITS_SQL:
+            conn.execute(text(sql), {'rows': rows})
+        savepoint.commit()
+    except Exception:
+        # Нет секции на текущий месяц — визиты проверяются на том, что есть
+        savepoint.rollback()
+    for table in SEED_TABLES:
+        conn.execute(text(f"ANALYZE {table}"))
+
+
+def explain(conn, statement):
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    plan = conn.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+def run_audit(rows=20000):
+    """EXPLAIN (ANALYZE, BUFFERS) по каждому запросу из audit_queries().
+
+    rows > 0 — сначала засеять таблицы (в транзакции, которая затем откатывается).
+    Возвращает список {'name', 'time_ms', 'shared_hit', 'shared_read', 'nodes', 'seq_scans', 'full_scan_ok'}."""
+    conn = db.session.connection()
+    report = []
+    try:
+        if rows > 0:
+            seed(conn, rows)
+        for name, statement, full_scan_ok in audit_queries():
+            result = explain(conn, statement)
+            plan = result['Plan']
+            nodes = list(_walk(plan))
+            report.append({
+                'name': name,
+                'time_ms': result.get('Execution Time', 0.0),
+                'shared_hit': plan.get('Shared Hit Blocks', 0),
+                'shared_read': plan.get('Shared Read Blocks', 0),
+                'nodes': sorted({
+                    f"{n['Node Type']} {n.get('Index Name') or n.get('Relation Name') or ''}".strip()
+                    for n in nodes if 'Scan' in n['Node Type']
+                }),
+                'seq_scans': sorted({n['Relation Name'] for n in nodes if n['Node Type'] == 'Seq Scan'}),
+                'full_scan_ok': full_scan_ok,
+            })
+    finally:
+        db.session.rollback()
+    return report
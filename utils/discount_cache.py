@@ -0,0 +1,63 @@
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database.engine import db
+from database.models.discount import Discount
+from utils.cache_generation import generations
+
+GENERATION = 'discounts'
+
+
+class ActiveDiscountCache:
+    """Снимок действующих скидок для публичной страницы.
+
+    Живёт до ближайшего expires_at среди действующих скидок (но не дольше max_ttl)
+    или до смены поколения 'discounts', которое сдвигает админка скидок.
+    Раньше этого момента набор видимых скидок измениться не может."""
+
+    def __init__(self):
+        self.max_ttl = 600
+        self._lock = threading.Lock()
+        self._generation = None
+        self._discounts = []
+        self._valid_until = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_ttl = float(app.config.get('DISCOUNT_CACHE_MAX_TTL', self.max_ttl))
+        app.extensions['discount_cache'] = self
+
+    def active(self):
+        generation, _ = generations.current(GENERATION)
+        with self._lock:
+            if generation == self._generation and time.monotonic() < self._valid_until:
+                self.hits += 1
+                return self._discounts
+            self.misses += 1
+
+        now = datetime.now()
+        table = Discount.__table__
+        discounts = db.session.execute(
+            select(table)
+            .where(table.c.is_active.is_(True))
+            .where(table.c.expires_at.is_(None) | (table.c.expires_at >= now))
+            .order_by(table.c.created_at.desc())
+        ).all()
+
+        ttl = self.max_ttl
+        expiries = [d.expires_at for d in discounts if d.expires_at is not None]
+        if expiries:
+            ttl = min(ttl, max(0.0, (min(expiries) - now).total_seconds()))
+
+        with self._lock:
+            self._generation = generation
+            self._discounts = discounts
+            self._valid_until = time.monotonic() + ttl
+        return discounts
+
+
+discount_cache = ActiveDiscountCache()
@@ -0,0 +1,243 @@
+import csv
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, render_template
+from markupsafe import Markup
+from sqlalchemy import select, update
+
+from database.engine import db
+from database.models.stored_file import StoredFile
+from database.models.work_order import IN_SERVICE, WorkOrder
+from utils.upload_stream import HEAD_SIZE, SIGNATURES
+from utils.user_agents import LRUCache
+
+MAX_ITEMS = 300         # строк сметы в превью; остальное — только в файле
+HEADER_SCAN_ROWS = 30   # в скольких первых строках искать шапку таблицы
+
+# Заголовки колонок сметы (по началу слова, без регистра)
+COLUMNS = {
+    'name': ('наимен', 'назван', 'работ', 'услуг', 'товар', 'детал', 'описан', 'запчаст'),
+    'qty': ('кол', 'шт'),
+    'price': ('цена',),
+    'amount': ('сумм', 'стоим'),
+}
+TOTAL_RE = re.compile(r'^\s*(итого|всего|total)', re.IGNORECASE)
+# Конец ошибки «формат не поддерживается»: такие превью estimate-previews разбирает заново
+UNSUPPORTED = 'не поддерживается для просмотра'
+
+
+def _number(value):
+    """Число из ячейки: 1200, '1 200,50', '1200 руб.'; None — не число"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = re.sub(r'[^\d,.\-]', '', str(value).replace('\xa0', '').replace(' ', '')).replace(',', '.')
+    try:
+        return float(text) if text not in ('', '-', '.') else None
+    except ValueError:
+        return None
+
+
+def _format(path):
+    """Формат файла по сигнатуре, как при загрузке (upload_stream): xlsx под .xls и файлы
+    без расширения (старые загрузки с кириллическим именем) определяются по содержимому"""
+    with open(path, 'rb') as f:
+        head = f.read(HEAD_SIZE)
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if head.startswith(SIGNATURES['xlsx']):
+        return 'xlsx'
+    if head.startswith(SIGNATURES['xls'][0]):
+        return 'xls'
+    if ext in ('', 'csv') and b'\x00' not in head:
+        return 'csv'
+    return ext
+
+
+def _read_rows(path):
+    """Строки первого листа кусками: openpyxl в режиме read_only (лист не грузится целиком) или csv"""
+    fmt = _format(path)
+    if fmt == 'xlsx':
+        from openpyxl import load_workbook
+
+        # Открытый файл, а не путь: openpyxl сверяет расширение имени, а у старых загрузок его нет
+        with open(path, 'rb') as f:
+            workbook = load_workbook(f, read_only=True, data_only=True)
+            try:
+                sheet = workbook.active
+                yield sheet.title
+                yield from sheet.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+    elif fmt == 'csv':
+        with open(path, 'rb') as f:
+            raw = f.read(64 * 1024)
+        encoding = 'utf-8-sig'
+        try:
+            raw.decode(encoding)
+        except UnicodeDecodeError:
+            encoding = 'cp1251'
+        with open(path, newline='', encoding=encoding, errors='replace') as f:
+            dialect = csv.Sniffer().sniff(raw.decode(encoding, errors='replace'), delimiters=';,\t')
+            yield 'CSV'
+            yield from csv.reader(f, dialect)
+    else:
+        raise ValueError(f'Формат {"." + fmt if fmt else "без расширения"} {UNSUPPORTED}')
+
+
+def _find_header(row):
+    columns = {}
+    for index, cell in enumerate(row):
+        title = str(cell or '').strip().lower()
+        for key, prefixes in COLUMNS.items():
+            if key not in columns and title.startswith(prefixes):
+                columns[key] = index
+                break
+    if 'name' in columns and len(columns) > 1:
+        return columns
+    return None
+
+
+def parse_estimate(path):
+    """Разбирает смету: {'sheet', 'items': [{'name', 'qty', 'price', 'amount'}], 'total', 'truncated'}.
+
+    Шапка ищется по названиям колонок; строка «Итого/Всего» даёт итог, иначе итог — сумма строк.
+    Ошибка разбора — {'error': текст}."""
+    try:
+        rows = _read_rows(path)
+        sheet = next(rows)
+        columns = None
+        items, total, truncated = [], None, False
+        for number, row in enumerate(rows):
+            row = list(row or ())
+            if columns is None:
+                if number >= HEADER_SCAN_ROWS:
+                    break
+                columns = _find_header(row)
+                continue
+
+            def cell(key, row=row, columns=columns):
+                index = columns.get(key)
+                return row[index] if index is not None and index < len(row) else None
+
+            name = str(cell('name') or '').strip()
+            numbers = [n for n in (_number(v) for v in row) if n is not None]
+            if TOTAL_RE.match(name) or any(TOTAL_RE.match(str(v or '')) for v in row[:columns['name']]):
+                total = _number(cell('amount')) if cell('amount') is not None else (numbers[-1] if numbers else None)
+                continue
+            if not name:
+                continue
+            qty, price, amount = _number(cell('qty')), _number(cell('price')), _number(cell('amount'))
+            if amount is None and qty is not None and price is not None:
+                amount = round(qty * price, 2)
+            if len(items) >= MAX_ITEMS:
+                truncated = True
+                continue
+            items.append({'name': name[:200], 'qty': qty, 'price': price, 'amount': amount})
+
+        if columns is None:
+            return {'error': 'Не найдена шапка таблицы (наименование, количество, цена, сумма)'}
+        if total is None and any(item['amount'] is not None for item in items):
+            total = round(sum(item['amount'] or 0 for item in items), 2)
+        return {'sheet': sheet, 'items': items, 'total': total, 'truncated': truncated}
+    except ImportError:
+        return {'error': 'Для просмотра смет нужен пакет openpyxl'}
+    except Exception as e:
+        return {'error': f'Не удалось прочитать файл: {e}'}
+
+
+class EstimatePreviews:
+    """Превью смет: файл разбирается один раз в фоновом потоке после загрузки,
+    результат хранится в stored_files.preview, готовый HTML — в LRU-кэше по SHA-256.
+    Доска ремонта файлы смет не открывает."""
+
+    def __init__(self):
+        self.app = None
+        self.workers = 1
+        self.html_cache = LRUCache(maxsize=500)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = int(app.config.get('ESTIMATE_PREVIEW_WORKERS', self.workers))
+        self.html_cache.maxsize = int(app.config.get('ESTIMATE_PREVIEW_CACHE_SIZE', self.html_cache.maxsize))
+        app.extensions['estimate_previews'] = self
+
+    def _get_executor(self):
+        # Потоки не переживают fork — в каждом воркере gunicorn свой пул
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='estimate-preview')
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, path):
+        """Ставит разбор сметы в очередь; вызывать после коммита, чтобы поток увидел строку stored_files"""
+        if path:
+            self._get_executor().submit(self._run, path)
+
+    def _run(self, path):
+        with self.app.app_context():
+            try:
+                self.process(path)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception(f"Ошибка разбора сметы {path}")
+
+    def process(self, path):
+        """Разбирает файл (если ещё не разобран) и подставляет итог в estimated_cost заказов без оценки"""
+        row = db.session.execute(select(StoredFile.preview).where(StoredFile.path == path)).first()
+        if row is None:
+            return None
+        preview = row.preview
+        if preview is None:
+            preview = parse_estimate(os.path.join(current_app.config['UPLOAD_FOLDER'], path))
+            db.session.execute(
+                update(StoredFile).where(StoredFile.path == path, StoredFile.preview.is_(None)).values(preview=preview)
+            )
+        if preview.get('total') is not None:
+            db.session.execute(
+                update(WorkOrder)
+                .where(WorkOrder.excel_file == path, WorkOrder.status == IN_SERVICE, WorkOrder.estimated_cost.is_(None))
+                .values(estimated_cost=preview['total'])
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        return preview
+
+    def for_paths(self, paths):
+        """{путь сметы: HTML превью} для строк доски. В обычном случае — один запрос (path, sha256)
+        и кэш; JSON превью читается из БД только для ещё не отрисованных файлов"""
+        paths = {p for p in paths if p}
+        if not paths:
+            return {}
+        hashes = dict(db.session.execute(
+            select(StoredFile.path, StoredFile.sha256).where(StoredFile.path.in_(paths))
+        ).all())
+
+        result, missing = {}, []
+        for path, sha256 in hashes.items():
+            html = self.html_cache.get(sha256)
+            if html is None:
+                missing.append(path)
+            else:
+                result[path] = html
+        if missing:
+            for path, sha256, preview in db.session.execute(
+                select(StoredFile.path, StoredFile.sha256, StoredFile.preview).where(StoredFile.path.in_(missing))
+            ):
+                html = Markup(render_template('partials/estimate_preview.html', preview=preview))
+                if preview is not None and 'error' not in preview:
+                    # Содержимое файла с этим SHA-256 не меняется — готовый HTML не устаревает.
+                    # Ошибку не кэшируем: flask estimate-previews может разобрать файл заново
+                    self.html_cache.put(sha256, html)
+                result[path] = html
+        return result
+
+
+estimate_previews = EstimatePreviews()
@@ -0,0 +1,82 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import abort, current_app, request
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+BACKENDS = ('direct', 'sendfile', 'x-accel', 'x-sendfile')
+
+
+class FileDelivery:
+    """Отдача загруженных файлов с выбором способа доставки (FILE_DELIVERY_BACKEND).
+
+    direct     — Python читает файл кусками (отладочный сервер, любой WSGI);
+    sendfile   — wsgi.file_wrapper сервера: gunicorn отдаёт файл через os.sendfile без копирования;
+    x-accel    — заголовок X-Accel-Redirect, файл отдаёт nginx (location с internal);
+    x-sendfile — заголовок X-Sendfile для Apache/lighttpd.
+
+    Проверки прав — в маршруте до вызова send(). ETag/If-None-Match проверяются здесь
+    для всех способов, Range — в direct/sendfile сам Werkzeug, в x-accel/x-sendfile — прокси."""
+
+    def __init__(self):
+        self.backend = 'sendfile'
+        self.accel_prefix = '/protected-uploads/'
+
+    def init_app(self, app):
+        self.backend = app.config.get('FILE_DELIVERY_BACKEND', self.backend)
+        if self.backend not in BACKENDS:
+            raise ValueError(f"FILE_DELIVERY_BACKEND: неизвестный способ {self.backend!r}, допустимы {BACKENDS}")
+        self.accel_prefix = app.config.get('FILE_DELIVERY_ACCEL_PREFIX', self.accel_prefix).rstrip('/') + '/'
+        app.extensions['file_delivery'] = self
+
+    @staticmethod
+    def etag(filename, stat):
+        # Файлы хранилища названы по SHA-256 содержимого — это и есть точный ETag
+        name = os.path.splitext(os.path.basename(filename))[0]
+        if len(name) == 64 and all(c in '0123456789abcdef' for c in name):
+            return name
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def send(self, root, filename, download_name=None):
+        """Ответ с файлом root/filename; ?download=1 — скачивание (Content-Disposition: attachment)"""
+        path = safe_join(root, filename)
+        if path is None:
+            abort(404)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            abort(404)
+
+        as_attachment = request.args.get('download') == '1'
+        download_name = download_name or os.path.basename(filename)
+        etag = self.etag(filename, stat)
+
+        if self.backend in ('direct', 'sendfile'):
+            environ = request.environ
+            if self.backend == 'direct':
+                environ = {k: v for k, v in environ.items() if k != 'wsgi.file_wrapper'}
+            return send_file(path, environ, as_attachment=as_attachment, download_name=download_name,
+                             conditional=True, etag=etag, last_modified=stat.st_mtime, max_age=None,
+                             response_class=current_app.response_class)
+
+        # Проксирующие способы: условный запрос решаем сами, тело отдаёт фронтовой сервер
+        response = current_app.response_class(mimetype=mimetypes.guess_type(download_name)[0] or 'application/octet-stream')
+        response.set_etag(etag)
+        response.last_modified = int(stat.st_mtime)
+        response.cache_control.no_cache = True
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+
+        disposition = 'attachment' if as_attachment else 'inline'
+        response.headers['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(download_name)}"
+        if self.backend == 'x-accel':
+            response.headers['X-Accel-Redirect'] = self.accel_prefix + quote(os.path.relpath(path, root))
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+        return response
+
+
+file_delivery = FileDelivery()
@@ -0,0 +1,47 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app
+from sqlalchemy import text
+
+from database.engine import db
+
+_executor = None
+_executor_pid = None
+
+
+def _get_executor():
+    # Потоки не переживают fork — в каждом воркере gunicorn свой исполнитель
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='health')
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _ping(app, timeout):
+    with app.app_context(), db.engine.connect() as conn:
+        conn.execute(text(f"SET LOCAL statement_timeout = {max(1, int(timeout * 1000))}"))
+        conn.execute(text('SELECT 1'))
+
+
+def check_database(timeout=None):
+    """Проверяет, что БД отвечает на SELECT 1 не дольше timeout секунд.
+
+    Проверка идёт в отдельном потоке: если все соединения пула заняты или БД
+    зависла, ответ всё равно придёт вовремя. Возвращает (ok, ошибка или None, мс)."""
+    if timeout is None:
+        timeout = float(current_app.config.get('HEALTH_DB_TIMEOUT', 2))
+    app = current_app._get_current_object()
+    started = time.perf_counter()
+    future = _get_executor().submit(_ping, app, timeout)
+    try:
+        future.result(timeout=timeout)
+        error = None
+    except FutureTimeout:
+        error = f'нет ответа за {timeout:g} с'
+    except Exception as e:
+        error = str(e).strip().splitlines()[0] if str(e).strip() else e.__class__.__name__
+    return error is None, error, round((time.perf_counter() - started) * 1000, 1)
@@ -0,0 +1,85 @@
+import math
+from datetime import timedelta
+
+
+class HyperLogLog:
+    """Оценка числа уникальных элементов по 64-битным хэшам за O(2^p) памяти"""
+
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    @classmethod
+    def from_registers(cls, data):
+        """Восстанавливает оценку из сохранённых регистров (bytes длиной 2^p)"""
+        sketch = cls(len(data).bit_length() - 1)
+        sketch.registers[:] = data
+        return sketch
+
+    def add(self, h):
+        idx = h >> (64 - self.p)
+        w = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - w.bit_length() + 1
+        self.registers[idx] = max(self.registers[idx], rank)
+
+    def merge(self, other):
+        # Поразрядный максимум регистров — оценка объединения множеств
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Поправка для малых значений — линейный подсчёт
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class DailySketches:
+    """HyperLogLog на каждый день (UTC); старые дни выбрасываются.
+
+    В буфере визитов это приращение процесса с последней записи в БД: drain() забирает его,
+    restore() возвращает обратно, если записать не удалось."""
+
+    def __init__(self, p=14, keep_days=62):
+        self.p = p
+        self.keep_days = keep_days
+        self._days = {}
+
+    def add(self, h, day):
+        sketch = self._days.get(day)
+        if sketch is None:
+            sketch = self._days[day] = HyperLogLog(self.p)
+            oldest = day - timedelta(days=self.keep_days)
+            for d in [d for d in self._days if d < oldest]:
+                del self._days[d]
+        sketch.add(h)
+
+    def __len__(self):
+        return len(self._days)
+
+    def drain(self):
+        """Забирает накопленные оценки {день: HyperLogLog} и начинает с пустых"""
+        days, self._days = self._days, {}
+        return days
+
+    def restore(self, days):
+        for day, sketch in days.items():
+            current = self._days.get(day)
+            self._days[day] = sketch if current is None else current.merge(sketch)
+
+    def sketch(self, start, end):
+        """Объединённая оценка за период [start, end]"""
+        total = HyperLogLog(self.p)
+        for day, sketch in self._days.items():
+            if start <= day <= end:
+                total.merge(sketch)
+        return total
+
+    def unique(self, start, end):
+        """Оценка уникальных посетителей за период [start, end]"""
+        return self.sketch(start, end).count()
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(statement='import wsgi'):
+    """Время импорта модулей по `python -X importtime` в отдельном чистом процессе.
+    Возвращает список (модуль, собственное время, с вложенными) в микросекундах."""
+    env = dict(os.environ, SCHEDULER_ENABLED='0')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=False,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue    # строка-заголовок
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    if result.returncode != 0:
+        raise RuntimeError(f"Импорт завершился с ошибкой:\n{result.stderr[-2000:]}")
+    return rows
+
+
+def print_report(statement='import wsgi', top=25):
+    """Отчёт о старте: общее время, самые тяжёлые модули и пакеты верхнего уровня"""
+    rows = import_times(statement)
+    total = sum(own for _, own, _ in rows)
+
+    packages = defaultdict(int)
+    for name, own, _ in rows:
+        packages[name.split('.')[0]] += own
+
+    print(f"{statement}: {total / 1000:.1f} мс, модулей: {len(rows)}")
+    print(f"\nМодули по собственному времени импорта (топ {top}):")
+    for name, own, cumulative in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"  {own / 1000:8.1f} мс  {cumulative / 1000:8.1f} мс всего  {name}")
+    print(f"\nПакеты верхнего уровня (топ {top}):")
+    for name, own in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]:
+        print(f"  {own / 1000:8.1f} мс  {100 * own / total:5.1f}%  {name}")
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+from database.engine import db
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels.items()) + '}' if labels else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Метрики процесса в текстовом формате Prometheus.
+
+    Счётчик запросов по эндпоинту/методу/статусу и гистограмма времени ответа
+    копятся в памяти; пул соединений, буфер визитов и кэши опрашиваются в момент
+    выгрузки. Под gunicorn у каждого воркера свои значения (метка pid)."""
+
+    def __init__(self):
+        self.buckets = DEFAULT_BUCKETS
+        self._requests = Counter()      # (эндпоинт, метод, статус) -> количество
+        self._latency = {}              # (эндпоинт, метод) -> [счётчики по корзинам, сумма, количество]
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        buckets = app.config.get('METRICS_BUCKETS')
+        if buckets:
+            self.buckets = tuple(sorted(float(b) for b in buckets))
+        app.extensions['metrics'] = self
+        app.before_request(self._start)
+        app.after_request(self._record)
+
+    @staticmethod
+    def _start():
+        g.metrics_started = time.perf_counter()
+
+    def _record(self, response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Эндпоинт, а не путь: число рядов не растёт от id в URL
+            self.observe(request.endpoint or 'unmatched', request.method, response.status_code,
+                         time.perf_counter() - started)
+        return response
+
+    def observe(self, endpoint, method, status, seconds):
+        with self._lock:
+            self._requests[(endpoint, method, status)] += 1
+            series = self._latency.get((endpoint, method))
+            if series is None:
+                series = self._latency[(endpoint, method)] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self):
+        pid = os.getpid()
+        out = []
+
+        def metric(name, kind, help_text, samples):
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                out.append(f'{name}{suffix}{_labels(pid=pid, **labels)} {_number(value)}')
+
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted((key, (list(v[0]), v[1], v[2])) for key, v in self._latency.items())
+
+        metric('http_requests_total', 'counter', 'HTTP-запросы по эндпоинту, методу и статусу', [
+            ('', {'endpoint': e, 'method': m, 'status': s}, n) for (e, m, s), n in requests
+        ])
+
+        samples = []
+        for (endpoint, method), (counts, total, count) in latency:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                samples.append(('_bucket', {'endpoint': endpoint, 'method': method, 'le': _number(bound)}, cumulative))
+            samples.append(('_bucket', {'endpoint': endpoint, 'method': method, 'le': '+Inf'}, count))
+            samples.append(('_sum', {'endpoint': endpoint, 'method': method}, total))
+            samples.append(('_count', {'endpoint': endpoint, 'method': method}, count))
+        metric('http_request_duration_seconds', 'histogram', 'Время обработки запроса, секунды', samples)
+
+        self._render_pool(metric)
+        self._render_app(metric)
+        return '\n'.join(out) + '\n'
+
+    @staticmethod
+    def _render_pool(metric):
+        pool = db.engine.pool
+        if not hasattr(pool, 'checkedout'):
+            return
+        metric('db_pool_size', 'gauge', 'Постоянных соединений в пуле', [('', {}, pool.size())])
+        metric('db_pool_checked_out', 'gauge', 'Соединений выдано запросам', [('', {}, pool.checkedout())])
+        metric('db_pool_checked_in', 'gauge', 'Свободных соединений в пуле', [('', {}, pool.checkedin())])
+        metric('db_pool_overflow', 'gauge', 'Соединений сверх pool_size (отрицательное — ещё не открыты)',
+               [('', {}, pool.overflow())])
+        if hasattr(pool, 'wait_seconds'):
+            metric('db_pool_checkouts_total', 'counter', 'Выдач соединения из пула', [('', {}, pool.checkouts)])
+            metric('db_pool_wait_seconds_total', 'counter', 'Суммарное ожидание свободного соединения, секунды',
+                   [('', {}, pool.wait_seconds)])
+            metric('db_pool_wait_seconds_max', 'gauge', 'Самое долгое ожидание соединения, секунды',
+                   [('', {}, pool.max_wait_seconds)])
+
+    @staticmethod
+    def _render_app(metric):
+        from utils.discount_cache import discount_cache
+        from utils.page_cache import page_cache
+        from utils.price_cache import price_list_cache
+        from utils.sql_stats import sql_stats
+        from utils.user_agents import ua_cache
+        from utils.visit_buffer import visit_buffer
+        from utils.visit_policy import visit_policy
+
+        metric('visit_buffer_pending', 'gauge', 'Визитов в памяти, ещё не записанных в БД',
+               [('', {}, visit_buffer.depth())])
+        metric('visit_requests_total', 'counter', 'Запросы по решению учёта визитов', [
+            ('', {'category': category}, n) for category, n in visit_policy.counters().items()
+        ])
+
+        caches = {'page': page_cache, 'user_agent': ua_cache, 'price': price_list_cache, 'discount': discount_cache}
+        metric('cache_hits_total', 'counter', 'Попадания в кэш', [
+            ('', {'cache': name}, cache.hits) for name, cache in caches.items()
+        ])
+        metric('cache_misses_total', 'counter', 'Промахи кэша', [
+            ('', {'cache': name}, cache.misses) for name, cache in caches.items()
+        ])
+        metric('cache_hit_ratio', 'gauge', 'Доля попаданий в кэш с запуска процесса', [
+            ('', {'cache': name}, cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0)
+            for name, cache in caches.items()
+        ])
+
+        counters = sql_stats.counters()
+        metric('sql_slow_requests_total', 'counter', 'Запросы сверх порогов числа SQL или времени в БД',
+               [('', {}, counters['slow_requests'])])
+        metric('sql_n_plus_one_requests_total', 'counter', 'Запросы с повторами одного SQL (N+1)',
+               [('', {}, counters['n_plus_one'])])
+
+
+metrics = Metrics()
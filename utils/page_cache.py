@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from flask import Response, make_response, request, session
+from flask_login import current_user
+
+CachedPage = namedtuple('CachedPage', 'body mimetype expires')
+
+
+class PageCache:
+    """Кэш готовых HTML-страниц: LRU с ограничением по суммарному размеру и TTL"""
+
+    def __init__(self):
+        self.ttl = 300
+        self.max_bytes = 32 * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = int(app.config.get('PAGE_CACHE_TTL', self.ttl))
+        self.max_bytes = int(app.config.get('PAGE_CACHE_MAX_BYTES', self.max_bytes))
+        app.extensions['page_cache'] = self
+
+    def get(self, key):
+        with self._lock:
+            page = self._data.get(key)
+            if page is None or page.expires < time.monotonic():
+                if page is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def set(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = CachedPage(body, mimetype, time.monotonic() + self.ttl)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._data)))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        page = self._data.pop(key)
+        self._size -= len(page.body)
+
+
+page_cache = PageCache()
+
+
+def _cacheable():
+    # Кэшируем только анонимные GET без flash-сообщений: остальным страница рисуется индивидуально
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if session.get('_flashes'):
+        return False
+    return not current_user.is_authenticated
+
+
+def cached_page(view):
+    """Отдаёт анонимным посетителям готовый HTML из page_cache, не заходя в Jinja"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _cacheable():
+            page_cache.bypasses += 1
+            return view(*args, **kwargs)
+
+        key = (request.path, 'anonymous')
+        page = page_cache.get(key)
+        if page is not None:
+            response = Response(page.body, mimetype=page.mimetype)
+            response.headers['X-Page-Cache'] = 'HIT'
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        # Страницу, которая что-то записала в сессию, кэшировать нельзя
+        if response.status_code == 200 and not response.direct_passthrough and not session.modified:
+            page_cache.set(key, response.get_data(), response.mimetype)
+        response.headers['X-Page-Cache'] = 'MISS'
+        return response
+
+    return wrapper
@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import date, datetime, time
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class KeysetPage:
+    """Страница выборки с курсорами на соседние страницы"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Размер страницы из параметра запроса, не больше MAX_PAGE_SIZE"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _to_json(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value, column):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is time:
+        return time.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps([_to_json(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Значения ключа из курсора; для испорченного курсора — None (первая страница)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return tuple(_from_json(v, c) for v, c in zip(values, columns))
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_page(query, columns, after=None, before=None, descending=False, limit=DEFAULT_PAGE_SIZE):
+    """Постраничная выборка по ключу (keyset/seek) вместо OFFSET.
+
+    columns — колонки сортировки, вместе уникальные (последней обычно идёт id);
+    под них нужен составной индекс, тогда каждая страница — один проход по диапазону индекса.
+    after/before — курсоры из KeysetPage.next_cursor/prev_cursor."""
+    key = tuple_(*columns)
+    after_values = decode_cursor(after, columns) if after else None
+    before_values = decode_cursor(before, columns) if before else None
+    backwards = before_values is not None and after_values is None
+
+    # Назад листаем обратной сортировкой и разворачиваем результат
+    reverse = descending != backwards
+    if after_values is not None:
+        query = query.filter(key < after_values if descending else key > after_values)
+    elif before_values is not None:
+        query = query.filter(key > before_values if descending else key < before_values)
+    query = query.order_by(*[c.desc() if reverse else c.asc() for c in columns])
+
+    items = query.limit(limit + 1).all()
+    more = len(items) > limit
+    items = items[:limit]
+    if backwards:
+        items.reverse()
+    if not items:
+        return KeysetPage(items)
+
+    def cursor(item):
+        return encode_cursor([getattr(item, c.key) for c in columns])
+
+    if backwards:
+        return KeysetPage(items, next_cursor=cursor(items[-1]), prev_cursor=cursor(items[0]) if more else None)
+    return KeysetPage(
+        items,
+        next_cursor=cursor(items[-1]) if more else None,
+        prev_cursor=cursor(items[0]) if after_values is not None else None,
+    )
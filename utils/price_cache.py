@@ -0,0 +1,87 @@
+import threading
+
+from flask import Response, render_template, request, session
+from flask_login import current_user
+from sqlalchemy import select
+from werkzeug.http import is_resource_modified
+
+from database.engine import db
+from database.models.servicePrice import ServicePrice
+from utils.cache_generation import generations
+
+GENERATION = 'prices'
+
+
+class PriceListCache:
+    """Прайс-лист для публичных страниц: список услуг и готовый HTML живут,
+    пока не сменится поколение 'prices' (его сдвигает админка цен)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._prices = []
+        self._pages = {}        # эндпоинт -> HTML для анонимного посетителя
+        self.hits = 0
+        self.misses = 0
+
+    def prices(self, generation):
+        with self._lock:
+            if generation == self._generation:
+                self.hits += 1
+                return self._prices
+            self.misses += 1
+
+        # Простые строки вместо ORM-объектов: их можно отдавать из разных потоков и сессий
+        table = ServicePrice.__table__
+        prices = db.session.execute(
+            select(table).where(table.c.is_active.is_(True)).order_by(table.c.service_name)
+        ).all()
+        with self._lock:
+            self._generation = generation
+            self._prices = prices
+            self._pages = {}
+        return prices
+
+    def render(self, generation, anonymous):
+        prices = self.prices(generation)
+        if not anonymous:
+            return render_template('price.html', prices=prices)
+
+        # Ссылка в меню подсвечивается по эндпоинту, поэтому HTML храним для каждого отдельно
+        with self._lock:
+            page = self._pages.get(request.endpoint) if generation == self._generation else None
+        if page is None:
+            page = render_template('price.html', prices=prices)
+            with self._lock:
+                if generation == self._generation:
+                    self._pages[request.endpoint] = page
+        return page
+
+    def response(self):
+        """Ответ для страниц прайса с ETag/Last-Modified; повторный запрос без изменений получает 304"""
+        generation, updated_at = generations.current(GENERATION)
+        if updated_at is not None:
+            updated_at = updated_at.replace(microsecond=0)
+
+        # Flash-сообщение показывается один раз — такую страницу не кэшируем нигде
+        if session.get('_flashes'):
+            return Response(render_template('price.html', prices=self.prices(generation)))
+
+        anonymous = not current_user.is_authenticated
+        identity = 'anon' if anonymous else f'u{current_user.id}'
+        etag = f'prices-{generation}-{identity}-{request.endpoint}'
+
+        if not is_resource_modified(request.environ, etag=etag, last_modified=updated_at):
+            response = Response(status=304)
+        else:
+            response = Response(self.render(generation, anonymous))
+        response.set_etag(etag)
+        if updated_at is not None:
+            response.last_modified = updated_at
+        response.cache_control.no_cache = True
+        if not anonymous:
+            response.cache_control.private = True
+        return response
+
+
+price_list_cache = PriceListCache()
@@ -0,0 +1,67 @@
+from datetime import datetime
+from functools import wraps
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+scheduler = BackgroundScheduler()
+
+
+def init_scheduler(app):
+    """Запускает фоновые задачи в потоке рядом с приложением — для отладочного сервера (python app.py --dev)"""
+    add_jobs(scheduler, app)
+    if not scheduler.running:
+        scheduler.start()
+
+
+def run_scheduler(app):
+    """Выполняет фоновые задачи в текущем процессе до его остановки (flask scheduler).
+
+    В бою это отдельный процесс: в мастере gunicorn потоки задач мешали бы fork воркеров
+    (блокировки логгера и пула соединений переходят в дочерний процесс занятыми)"""
+    blocking = BlockingScheduler()
+    add_jobs(blocking, app)
+    try:
+        blocking.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
+def add_jobs(scheduler, app):
+    """Регистрирует фоновые задачи в планировщике.
+    Задачи выполняются в контексте приложения — иначе им недоступна БД."""
+
+    def in_app_context(func):
+        @wraps(func)
+        def job():
+            with app.app_context():
+                return func()
+        return job
+
+    from routes.admin_routes.admin_discounts import cleanup_expired_discounts
+    from utils.upload_gc import collect_garbage
+    from utils.visit_partitions import maintain_visit_partitions
+
+    scheduler.add_job(
+        func=in_app_context(cleanup_expired_discounts),
+        trigger=IntervalTrigger(hours=1),
+        id='cleanup_discounts',
+        name='Cleanup expired discounts',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=in_app_context(maintain_visit_partitions),
+        trigger=IntervalTrigger(hours=24),
+        next_run_time=datetime.now(),  # секции на текущий месяц нужны сразу
+        id='visit_partitions',
+        name='Create upcoming and drop expired visit partitions',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=in_app_context(collect_garbage),
+        trigger=IntervalTrigger(hours=24),
+        id='uploads_gc',
+        name='Quarantine and delete orphaned uploads',
+        replace_existing=True
+    )
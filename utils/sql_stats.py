@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+
+from database.engine import db
+
+
+class RequestSqlStats:
+    __slots__ = ('count', 'seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def repeated(self, threshold):
+        """Одинаковые запросы, выполненные threshold и более раз (признак N+1)"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+class SqlStats:
+    """Счётчик SQL-запросов и времени в БД на каждый HTTP-запрос.
+
+    Слушатели событий движка складывают статистику в g; после ответа она попадает
+    в заголовки (в debug и для админов), а тяжёлые запросы и повторы одного и того же
+    SQL (N+1) пишутся в лог. Запросы вне HTTP-запроса (фоновые потоки, команды) не считаются."""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = True
+        self.headers = True
+        self.max_queries = 30
+        self.max_ms = 500.0
+        self.repeat_threshold = 5
+        self.requests = 0
+        self.slow_requests = 0
+        self.n_plus_one = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = bool(app.config.get('SQL_STATS_ENABLED', self.enabled))
+        self.headers = bool(app.config.get('SQL_STATS_HEADERS', self.headers))
+        self.max_queries = int(app.config.get('SQL_SLOW_REQUEST_QUERIES', self.max_queries))
+        self.max_ms = float(app.config.get('SQL_SLOW_REQUEST_MS', self.max_ms))
+        self.repeat_threshold = int(app.config.get('SQL_REPEAT_THRESHOLD', self.repeat_threshold))
+        app.extensions['sql_stats'] = self
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.after_request(self._after_request)
+
+    @staticmethod
+    def current():
+        """Статистика текущего HTTP-запроса (None — вне запроса или запросов к БД не было)"""
+        return g.get('sql_stats') if has_request_context() else None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Время старта — на контексте выполнения: он живёт один запрос, и если запрос упал
+        # (after_cursor_execute не вызывается), метка не достанется следующему запросу соединения
+        if has_request_context() and context is not None:
+            context._sql_stats_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_sql_stats_started', None)
+        if started is None or not has_request_context():
+            return
+        elapsed = time.perf_counter() - started
+        stats = g.get('sql_stats')
+        if stats is None:
+            stats = g.sql_stats = RequestSqlStats()
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+
+    def _show_headers(self):
+        if not self.headers:
+            return False
+        if self.app.debug:
+            return True
+        # current_user уже загружен страницей — заголовки видят только сотрудники
+        return current_user.is_authenticated and getattr(current_user, 'is_admin', False)
+
+    def _after_request(self, response):
+        stats = g.pop('sql_stats', None)
+        with self._lock:
+            self.requests += 1
+        if stats is None:
+            return response
+
+        ms = stats.seconds * 1000
+        repeated = stats.repeated(self.repeat_threshold)
+        logger = self.app.logger
+        where = f"{request.method} {request.path} ({request.endpoint})"
+
+        if stats.count > self.max_queries or ms > self.max_ms:
+            with self._lock:
+                self.slow_requests += 1
+            logger.warning(f"Тяжёлый запрос {where}: {stats.count} SQL, {ms:.1f} мс в БД")
+        if repeated:
+            with self._lock:
+                self.n_plus_one += 1
+            for sql, n in repeated:
+                logger.warning(f"Возможный N+1 в {where}: {n} раз — {' '.join(sql.split())[:300]}")
+
+        if self._show_headers():
+            response.headers['X-DB-Queries'] = str(stats.count)
+            response.headers['X-DB-Time'] = f"{ms:.1f}"
+            if repeated:
+                response.headers['X-DB-Repeated'] = str(sum(n for _sql, n in repeated))
+            response.headers.add('Server-Timing', f'db;dur={ms:.1f};desc="{stats.count} queries"')
+        return response
+
+    def counters(self):
+        with self._lock:
+            return {'requests': self.requests, 'slow_requests': self.slow_requests, 'n_plus_one': self.n_plus_one}
+
+
+sql_stats = SqlStats()
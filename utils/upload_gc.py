@@ -0,0 +1,119 @@
+import os
+import shutil
+import time
+
+from flask import current_app
+from sqlalchemy import literal, select, union_all
+
+from database.engine import db
+from database.models.discount import Discount
+from database.models.stored_file import StoredFile
+from database.models.work_order import WorkOrder
+
+QUARANTINE_DIR = '.quarantine'
+
+
+def upload_roots():
+    """Каталоги загрузок: {имя: абсолютный путь}. Ссылки в БД хранятся относительно них"""
+    return {
+        'excel': os.path.abspath(current_app.config['UPLOAD_FOLDER']),
+        # discount.image = 'uploads/discounts/...' — относительно static
+        'discounts': os.path.abspath(os.path.join(current_app.static_folder, 'uploads', 'discounts')),
+    }
+
+
+def referenced_files(roots):
+    """Абсолютные пути всех файлов, на которые ссылается БД, — одним запросом"""
+    query = union_all(
+        select(literal('excel'), WorkOrder.excel_file).where(WorkOrder.excel_file.isnot(None)),
+        select(literal('excel'), StoredFile.path),
+        select(literal('discounts'), Discount.image).where(Discount.image.isnot(None)),
+    )
+    static = os.path.abspath(current_app.static_folder)
+    referenced = set()
+    for root, name in db.session.execute(query):
+        base = static if root == 'discounts' else roots[root]
+        referenced.add(os.path.normpath(os.path.join(base, name)))
+    return referenced
+
+
+def _scan(directory, skip=None):
+    """Файлы каталога рекурсивно через os.scandir: (путь, stat)"""
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.path != skip:
+                yield from _scan(entry.path, skip)
+        elif entry.is_file(follow_symlinks=False):
+            yield entry.path, entry.stat(follow_symlinks=False)
+
+
+def _move(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+
+
+def collect_garbage(grace_hours=None, quarantine_days=None, dry_run=False):
+    """Сборка мусора в каталогах загрузок.
+
+    Файл, на который не ссылается ни work_order, ни stored_files, ни discounts, и который
+    не менялся дольше grace_hours (за это время успевает закоммититься загрузка), уходит
+    в карантин UPLOAD_FOLDER/.quarantine/<каталог>/. Через quarantine_days файл удаляется
+    окончательно; если ссылка на него за это время появилась — возвращается на место.
+    Возвращает отчёт со счётчиками и освобождёнными байтами."""
+    config = current_app.config
+    if grace_hours is None:
+        grace_hours = float(config.get('UPLOAD_GC_GRACE_HOURS', 24))
+    if quarantine_days is None:
+        quarantine_days = float(config.get('UPLOAD_GC_QUARANTINE_DAYS', 7))
+
+    roots = upload_roots()
+    quarantine = os.path.join(roots['excel'], QUARANTINE_DIR)
+    referenced = referenced_files(roots)
+    db.session.rollback()   # дальше только файловая система — транзакцию не держим
+
+    now = time.time()
+    report = {'scanned': 0, 'orphans': 0, 'quarantined': 0, 'restored': 0, 'deleted': 0,
+              'quarantined_bytes': 0, 'reclaimed_bytes': 0}
+
+    # Карантин: вернуть то, на что снова ссылаются, удалить пролежавшее срок
+    for name, root in roots.items():
+        for path, stat in _scan(os.path.join(quarantine, name)):
+            original = os.path.join(root, os.path.relpath(path, os.path.join(quarantine, name)))
+            if original in referenced and not os.path.exists(original):
+                if not dry_run:
+                    _move(path, original)
+                report['restored'] += 1
+            elif original in referenced:
+                # Файл уже загружен заново — копия в карантине лишняя
+                if not dry_run:
+                    os.remove(path)
+                report['deleted'] += 1
+                report['reclaimed_bytes'] += stat.st_size
+            elif now - stat.st_mtime > quarantine_days * 86400:
+                if not dry_run:
+                    os.remove(path)
+                report['deleted'] += 1
+                report['reclaimed_bytes'] += stat.st_size
+
+    # Новые сироты — в карантин (время помещения — mtime файла)
+    for name, root in roots.items():
+        for path, stat in _scan(root, skip=quarantine):
+            report['scanned'] += 1
+            if path in referenced:
+                continue
+            report['orphans'] += 1
+            if now - stat.st_mtime < grace_hours * 3600:
+                continue
+            if not dry_run:
+                target = os.path.join(quarantine, name, os.path.relpath(path, root))
+                _move(path, target)
+                os.utime(target, (now, now))
+            report['quarantined'] += 1
+            report['quarantined_bytes'] += stat.st_size
+
+    current_app.logger.info(f"Сборка мусора в загрузках: {report}")
+    return report
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import tempfile
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import delete, update
+
+from database.dialect import insert
+from database.engine import db
+from database.models.stored_file import StoredFile
+from utils.upload_stream import TMP_DIR, spooled
+from utils.utc import utcnow
+
+CHUNK_SIZE = 64 * 1024
+
+
+def shard_path(sha256, ext):
+    """Путь файла в хранилище относительно UPLOAD_FOLDER: ab/cd/abcd....xlsx"""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def store_upload(file):
+    """Сохраняет загруженный файл (FileStorage) в хранилище по содержимому.
+
+    Маршрут со streamed_upload('excel') уже принял тело во временный файл хранилища
+    с подсчётом SHA-256 — он переносится без повторного чтения; иначе тело копируется
+    кусками здесь. Файл с таким содержимым уже есть — временный удаляется, у строки
+    stored_files растёт ref_count. Возвращает путь относительно UPLOAD_FOLDER. Коммит — за вызывающим.
+    Расширение не из ALLOWED_EXTENSIONS — ValueError."""
+    root = current_app.config['UPLOAD_FOLDER']
+    # Расширение — из исходного имени: secure_filename() выбрасывает кириллицу вместе с точкой
+    # ('смета.xlsx' -> 'xlsx'), и файл лёг бы в хранилище без расширения
+    ext = os.path.splitext(file.filename or '')[1].lower()
+    if ext[1:] not in current_app.config['ALLOWED_EXTENSIONS']:
+        raise ValueError(f"Недопустимый тип файла: {file.filename}")
+    spool = spooled(file)
+    if spool is not None:
+        tmp_path, sha256, size = spool.path, spool.sha256, spool.size
+    else:
+        tmp_path, sha256, size = _copy_to_tmp(file, os.path.join(root, TMP_DIR))
+    try:
+
+        # Строка блокируется до коммита: параллельный release() не снимет с неё ссылку, пока мы кладём файл
+        now = utcnow()
+        table = StoredFile.__table__
+        stmt = insert(table).values(
+            sha256=sha256, path=shard_path(sha256, ext), size=size, ref_count=1, created_at=now, updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sha256],
+            set_={'ref_count': table.c.ref_count + 1, 'updated_at': now},
+        ).returning(table.c.path)
+        path = db.session.execute(stmt).scalar_one()
+
+        target = os.path.join(root, path)
+        if os.path.exists(target):
+            os.remove(tmp_path)
+            # Файл мог остаться от снятой ссылки и ждать сборщика мусора: свежее mtime — он снова в деле
+            os.utime(target)
+        elif spool is not None:
+            spool.move_to(target)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def _copy_to_tmp(file, tmp_dir):
+    """Копирует тело FileStorage во временный файл tmp_dir: (путь, SHA-256, размер)"""
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+def release(paths):
+    """Снимает по ссылке с каждого пути из paths (повтор пути — несколько ссылок).
+
+    Строки, на которые больше никто не ссылается, удаляются, а сами файлы остаются на диске:
+    коммит вызывающего ещё может не пройти, и откат вернул бы ссылку на уже удалённый файл.
+    Такие файлы уносит сборщик мусора (utils/upload_gc.py) после UPLOAD_GC_GRACE_HOURS и карантина;
+    повторная загрузка того же содержимого за это время переиспользует файл.
+    Пути без строки в stored_files не трогаются. Коммит — за вызывающим.
+    Возвращает список путей, оставшихся без ссылок."""
+    counts = Counter(p for p in paths if p)
+    if not counts:
+        return []
+
+    by_count = {}
+    for path, n in counts.items():
+        by_count.setdefault(n, []).append(path)
+    now = utcnow()
+    for n, group in by_count.items():
+        db.session.execute(
+            update(StoredFile)
+            .where(StoredFile.path.in_(group))
+            .values(ref_count=StoredFile.ref_count - n, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    removed = db.session.execute(
+        delete(StoredFile)
+        .where(StoredFile.path.in_(list(counts)), StoredFile.ref_count <= 0)
+        .returning(StoredFile.path)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    return removed
@@ -0,0 +1,257 @@
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app, flash, jsonify, redirect, request, url_for
+from flask_login import current_user
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+TMP_DIR = '.tmp'    # временные файлы загрузки — в том же разделе, что и хранилище (os.replace без копирования)
+
+# Сигнатуры начала файла по расширению; None — текст без сигнатуры (в начале не должно быть нулевых байт)
+SIGNATURES = {
+    'xlsx': (b'PK\x03\x04',),
+    # Старый .xls — контейнер OLE; под этим расширением часто сохраняют и xlsx
+    'xls': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', b'PK\x03\x04'),
+    'csv': None,
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+}
+HEAD_SIZE = 512     # столько байт начала файла копится в памяти до проверки
+FORM_OVERHEAD = 1024 * 1024     # запас на текстовые поля формы сверх лимита файла
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif')
+
+
+def megabytes(size):
+    return f"{size / (1024 * 1024):.3g}"
+
+
+def discount_upload_folder():
+    """Каталог картинок скидок: discount.image = 'uploads/discounts/...' — относительно static"""
+    return os.path.join(current_app.static_folder, 'uploads', 'discounts')
+
+
+class UploadPolicy:
+    """Что принимает маршрут: допустимые расширения, лимит размера файла (ключ конфига)
+    и каталог назначения — временный файл создаётся рядом, чтобы сохранить его через os.replace"""
+
+    def __init__(self, extensions, size_key, folder):
+        self.extensions = extensions
+        self.size_key = size_key
+        self.folder = folder
+
+    def allowed(self):
+        return set(self.extensions() if callable(self.extensions) else self.extensions)
+
+    def max_size(self):
+        return int(current_app.config[self.size_key])
+
+    def open(self, filename):
+        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        allowed = self.allowed()
+        if ext not in allowed:
+            raise UnsupportedMediaType(
+                f"Файл {filename}: недопустимый тип, разрешены {', '.join(sorted(allowed))}"
+            )
+        return UploadSpool(os.path.join(self.folder(), TMP_DIR), filename, ext, self.max_size())
+
+
+POLICIES = {
+    'excel': UploadPolicy(lambda: current_app.config['ALLOWED_EXTENSIONS'], 'UPLOAD_EXCEL_MAX_SIZE',
+                          lambda: current_app.config['UPLOAD_FOLDER']),
+    'image': UploadPolicy(IMAGE_EXTENSIONS, 'UPLOAD_IMAGE_MAX_SIZE', discount_upload_folder),
+}
+
+
+class UploadSpool:
+    """Приёмник файла из multipart-тела, который Werkzeug заполняет по мере чтения запроса.
+
+    Начало файла копится в памяти и сверяется с сигнатурой до первой записи на диск; тело
+    пишется сразу во временный файл каталога назначения с подсчётом SHA-256 и размера.
+    Неверный тип — 415, превышен лимит — 413: разбор тела прерывается на этом куске,
+    временный файл удаляется. Сохранение — move_to() (os.replace, без второй копии)."""
+
+    def __init__(self, directory, filename, ext, max_size):
+        self.filename = filename
+        self.ext = ext
+        self.max_size = max_size
+        self.size = 0
+        self.moved = False
+        self._digest = hashlib.sha256()
+        self._head = b''
+        self._sniffed = False
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.close()
+            raise RequestEntityTooLarge(
+                f"Файл {self.filename} больше {megabytes(self.max_size)} МБ"
+            )
+        self._digest.update(data)
+        if self._sniffed:
+            return self._file.write(data)
+        self._head += data
+        if len(self._head) >= HEAD_SIZE:
+            self._sniff()
+        return len(data)
+
+    def _sniff(self):
+        self._sniffed = True
+        head, self._head = self._head, b''
+        if not head:
+            self.close()
+            raise UnsupportedMediaType(f"Файл {self.filename} пустой")
+        signatures = SIGNATURES.get(self.ext)
+        if signatures is None:
+            ok = b'\x00' not in head
+        else:
+            ok = head.startswith(signatures)
+        if not ok:
+            self.close()
+            raise UnsupportedMediaType(f"Файл {self.filename}: содержимое не похоже на .{self.ext}")
+        self._file.write(head)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # Werkzeug перематывает файл в начало, когда часть тела прочитана: маленький (и пустой) файл проверяется здесь
+        if not self._sniffed:
+            self._sniff()
+        return self._file.seek(offset, whence)
+
+    def move_to(self, target):
+        """Переносит принятый файл в target (тот же раздел — os.replace без копирования)"""
+        self.seek(0)
+        self._file.close()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(self.path, target)
+        self.moved = True
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.moved and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # read, readline, tell и прочее — от открытого временного файла
+        return getattr(self._file, name)
+
+
+def spooled(file):
+    """UploadSpool загруженного файла (FileStorage) или None, если маршрут без streamed_upload"""
+    stream = getattr(file, 'stream', None)
+    return stream if isinstance(stream, UploadSpool) and not stream.moved else None
+
+
+def save_upload(file, target):
+    """Сохраняет FileStorage в target: переносом временного файла, если он уже принят потоково"""
+    spool = spooled(file)
+    if spool is not None:
+        spool.move_to(target)
+    else:
+        file.save(target)
+
+
+def streamed_upload(policy, back=None):
+    """Маршрут принимает файлы потоково по политике policy ('excel' или 'image').
+
+    back — эндпоинт, куда вернуть пользователя при отказе, если нет Referer.
+    Ставится под login_required: functools.wraps переносит атрибуты на обёртку."""
+    def decorator(view):
+        view.upload_policy = POLICIES[policy]
+        view.upload_back = back
+        return view
+    return decorator
+
+
+def _route_view():
+    return current_app.view_functions.get(request.endpoint) if request.endpoint else None
+
+
+class UploadRequest(Request):
+    """Запрос, который отдаёт файлы из multipart в UploadSpool маршрута и меряет тело его лимитом"""
+
+    def _upload_policy(self):
+        if not current_app or not self.endpoint:
+            return None
+        return getattr(current_app.view_functions.get(self.endpoint), 'upload_policy', None)
+
+    @property
+    def max_content_length(self):
+        policy = self._upload_policy()
+        if policy is None:
+            return super().max_content_length
+        # Тело больше лимита отклоняется по Content-Length ещё до чтения
+        return policy.max_size() + FORM_OVERHEAD
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        policy = self._upload_policy()
+        if policy is None or not filename:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        spool = policy.open(filename)
+        self.__dict__.setdefault('_upload_spools', []).append(spool)
+        return spool
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            # Не перенесённые в хранилище файлы (ошибка, откат) удаляются вместе с запросом
+            for spool in self.__dict__.pop('_upload_spools', ()):
+                spool.close()
+
+
+class UploadStream:
+    """Потоковый приём файлов: подключает UploadRequest и ответы на отказ (413/415).
+
+    Тело запроса к маршруту со streamed_upload разбирается до вызова view, чтобы отказ
+    не попал в общий except маршрута; гостю и не админу тело не читается — их отсекает сам view."""
+
+    def init_app(self, app):
+        app.request_class = UploadRequest
+        app.before_request(self._receive)
+        app.register_error_handler(RequestEntityTooLarge, self._rejected)
+        app.register_error_handler(UnsupportedMediaType, self._rejected)
+        app.extensions['upload_stream'] = self
+
+    @staticmethod
+    def _receive():
+        if request.method != 'POST' or getattr(_route_view(), 'upload_policy', None) is None:
+            return
+        if current_user.is_authenticated and getattr(current_user, 'is_admin', False):
+            request.files  # noqa: B018 — разбор multipart: файлы пишутся в UploadSpool, отказ — 413/415 сразу
+
+    @staticmethod
+    def _rejected(error):
+        view = _route_view()
+        policy = getattr(view, 'upload_policy', None)
+        if policy is None:
+            return error
+
+        message = error.description
+        if message == type(error).description:
+            # Отказ Werkzeug по Content-Length — до чтения тела
+            message = f"Файл больше {megabytes(policy.max_size())} МБ"
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            response = jsonify({'success': False, 'error': message})
+            response.status_code = error.code
+        else:
+            flash(message, 'danger')
+            back = request.referrer or url_for(view.upload_back or 'index.index')
+            response = redirect(back)
+        # Остаток тела не дочитывается: соединение закрывается после ответа
+        response.headers['Connection'] = 'close'
+        return response
+
+
+upload_stream = UploadStream()
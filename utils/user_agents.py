@@ -0,0 +1,81 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from database.dialect import insert
+from database.engine import db
+from database.models.user_agent import UserAgent
+
+# Длиннее User-Agent не бывает у настоящих браузеров, остальное обрезаем
+MAX_USER_AGENT_LENGTH = 1024
+
+
+def normalize_user_agent(value):
+    return (value or '')[:MAX_USER_AGENT_LENGTH]
+
+
+def ua_hash(value):
+    return hashlib.sha1(value.encode('utf-8', 'replace')).hexdigest()
+
+
+class LRUCache:
+    """Простой потокобезопасный LRU-кэш"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+ua_cache = LRUCache()
+
+
+def intern_user_agents(values):
+    """Возвращает {строка UA: id в user_agents}, добавляя недостающие строки.
+    Фиксирует свою транзакцию сразу: id в кэше не должны пропасть при откате визитов."""
+    by_hash = {ua_hash(normalize_user_agent(v)): normalize_user_agent(v) for v in values}
+    ids = {}
+    missing = []
+    for h in by_hash:
+        ua_id = ua_cache.get(h)
+        if ua_id is None:
+            missing.append(h)
+        else:
+            ids[h] = ua_id
+
+    if missing:
+        db.session.execute(
+            insert(UserAgent.__table__)
+            .values([{'hash': h, 'value': by_hash[h]} for h in missing])
+            .on_conflict_do_nothing(index_elements=['hash'])
+        )
+        rows = db.session.execute(
+            db.select(UserAgent.id, UserAgent.hash).where(UserAgent.hash.in_(missing))
+        ).all()
+        db.session.commit()
+        for ua_id, h in rows:
+            ua_cache.put(h, ua_id)
+            ids[h] = ua_id
+
+    return {v: ids[ua_hash(normalize_user_agent(v))] for v in values}
@@ -0,0 +1,6 @@
+from datetime import UTC, datetime
+
+
+def utcnow():
+    """Текущее время UTC без часового пояса — в таком виде время хранится в колонках DateTime"""
+    return datetime.now(UTC).replace(tzinfo=None)
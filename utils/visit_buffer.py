@@ -0,0 +1,167 @@
+import atexit
+import os
+import threading
+
+from database.dialect import insert
+from database.engine import db
+from database.models.visit import Visit
+from utils.hyperloglog import DailySketches
+from utils.user_agents import intern_user_agents, ua_cache
+from utils.visit_dedupe import DailyDedupe, hash_key
+from utils.visit_rollup import add_to_rollup, load_sketch, save_sketches
+
+
+class VisitBuffer:
+    """Буфер визитов: запрос только кладёт визит в память,
+    а фоновый поток пачками пишет их в таблицу visit (INSERT ... ON CONFLICT DO NOTHING)."""
+
+    def __init__(self):
+        self.app = None
+        self.flush_interval = 5.0
+        self.flush_size = 500
+        self.max_pending = 50000
+
+        self._lock = threading.Lock()
+        self._pending = {}      # (день, хэш посетителя) -> строка для INSERT
+        self.dedupe = DailyDedupe()
+        self.sketches = DailySketches()     # приращение оценок уникальных с последней записи в БД
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = float(app.config.get('VISIT_FLUSH_INTERVAL', self.flush_interval))
+        self.flush_size = int(app.config.get('VISIT_FLUSH_SIZE', self.flush_size))
+        self.max_pending = int(app.config.get('VISIT_MAX_PENDING', self.max_pending))
+        ua_cache.maxsize = int(app.config.get('VISIT_UA_CACHE_SIZE', ua_cache.maxsize))
+        self.dedupe = DailyDedupe(
+            max_exact=int(app.config.get('VISIT_DEDUPE_MAX_EXACT', 100000)),
+            bloom_capacity=int(app.config.get('VISIT_DEDUPE_BLOOM_CAPACITY', 1000000)),
+        )
+        app.extensions['visit_buffer'] = self
+        atexit.register(self.stop)
+
+    @staticmethod
+    def visitor_hash(user_id, ip, user_agent):
+        # Авторизованный пользователь считается по id, гость — по паре ip + user_agent
+        if user_id is not None:
+            return hash_key('u', user_id)
+        return hash_key('g', ip, user_agent)
+
+    def add(self, user_id, ip, user_agent, day):
+        """Регистрирует визит без обращения к БД (day — дата по UTC)"""
+        h = self.visitor_hash(user_id, ip, user_agent)
+
+        with self._lock:
+            self.sketches.add(h, day)
+            if len(self._pending) >= self.max_pending:
+                # БД не успевает — лучше потерять визит, чем память. Посетитель не помечается
+                # увиденным: его следующий визит за сутки ещё будет записан
+                return False
+            if self.dedupe.check_and_add(h, day):
+                return False
+            self._pending[(day, h)] = {
+                'user_id': user_id,
+                'ip': ip,
+                'user_agent': user_agent,
+                'date': day,
+            }
+            pending = len(self._pending)
+
+        self._ensure_thread()
+        if pending >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def depth(self):
+        return len(self._pending)
+
+    def unique_visitors(self, start, end):
+        """Оценка (HyperLogLog) уникальных посетителей за период: регистры из visit_daily_rollup,
+        общие для всех процессов, плюс ещё не записанное приращение этого процесса"""
+        total = load_sketch(start, end, self.sketches.p)
+        with self._lock:
+            return total.merge(self.sketches.sketch(start, end)).count()
+
+    def flush(self):
+        """Записывает накопленные визиты и оценки уникальных в БД. Возвращает число отправленных строк."""
+        with self._lock:
+            if not self._pending and not self.sketches:
+                return 0
+            batch, self._pending = self._pending, {}
+            sketches = self.sketches.drain()
+
+        with self.app.app_context():
+            try:
+                # Строки User-Agent заменяем на id из словаря user_agents
+                ua_ids = intern_user_agents({row['user_agent'] for row in batch.values()}) if batch else {}
+                rows = [
+                    {'user_id': row['user_id'], 'ip': row['ip'], 'ua_id': ua_ids[row['user_agent']], 'date': row['date']}
+                    for row in batch.values()
+                ]
+                # Процессы вставляют одних и тех же посетителей в одном порядке — без взаимных блокировок
+                rows.sort(key=lambda r: (r['date'], r['user_id'] is None, r['user_id'] or 0, r['ip'] or '', r['ua_id'] or 0))
+
+                table = Visit.__table__
+                inserted = []
+                for start in range(0, len(rows), self.flush_size):
+                    chunk = rows[start:start + self.flush_size]
+                    inserted += db.session.execute(
+                        insert(table).values(chunk).on_conflict_do_nothing()
+                        .returning(table.c.user_id, table.c.date)
+                    ).all()
+                # Дневные счётчики растут только на реально вставленные строки. Строки сводки
+                # блокируются последними, когда все визиты пачки уже вставлены
+                add_to_rollup(inserted)
+                save_sketches(sketches)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Не удалось записать {len(batch)} визитов: {e}")
+                # Возвращаем визиты в буфер — попробуем в следующий раз
+                with self._lock:
+                    self.sketches.restore(sketches)
+                    for key, row in batch.items():
+                        if len(self._pending) >= self.max_pending:
+                            break
+                        self._pending.setdefault(key, row)
+                return 0
+            finally:
+                db.session.remove()
+        return len(batch)
+
+    def stop(self):
+        """Останавливает фоновый поток и сбрасывает остаток буфера"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval + 5)
+        if self.app is not None:
+            self.flush()
+
+    def _ensure_thread(self):
+        # После fork (gunicorn) поток родителя в дочернем процессе не существует — запускаем свой
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='visit-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f"Ошибка фоновой записи визитов: {e}")
+
+
+visit_buffer = VisitBuffer()
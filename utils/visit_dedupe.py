@@ -0,0 +1,87 @@
+import hashlib
+import math
+
+
+def hash_key(*parts):
+    """64-битный хэш кортежа (user_id или ip + user_agent)"""
+    raw = '\x1f'.join('' if p is None else str(p) for p in parts)
+    return int.from_bytes(hashlib.blake2b(raw.encode('utf-8', 'replace'), digest_size=8).digest(), 'big')
+
+
+class BloomFilter:
+    """Фильтр Блума поверх 64-битных хэшей (double hashing)"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, h):
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, h):
+        """Добавляет хэш. Возвращает True, если его (вероятно) ещё не было."""
+        added = False
+        for pos in self._positions(h):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, h):
+        for pos in self._positions(h):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+
+class DailyDedupe:
+    """Множество посетителей за текущие сутки (UTC).
+
+    Пока посетителей немного, хранятся точные хэши. Когда их больше max_exact,
+    множество переезжает в фильтр Блума фиксированного размера. Ложное
+    срабатывание фильтра означает лишь пропущенный визит, дубль в БД всё равно
+    отсечёт уникальный индекс."""
+
+    def __init__(self, max_exact=100000, bloom_capacity=1000000, error_rate=0.001):
+        self.max_exact = max_exact
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self.day = None
+        self._exact = set()
+        self._bloom = None
+
+    def reset(self, day):
+        self.day = day
+        self._exact = set()
+        self._bloom = None
+
+    def check_and_add(self, h, day):
+        """True, если посетитель уже был сегодня; иначе запоминает его и возвращает False"""
+        if day != self.day:
+            self.reset(day)
+
+        if self._bloom is not None:
+            return not self._bloom.add(h)
+
+        if h in self._exact:
+            return True
+        self._exact.add(h)
+        if len(self._exact) > self.max_exact:
+            self._bloom = BloomFilter(self.bloom_capacity, self.error_rate)
+            for item in self._exact:
+                self._bloom.add(item)
+            self._exact = set()
+        return False
+
+    def __len__(self):
+        return len(self._exact)
+
+    @property
+    def uses_bloom(self):
+        return self._bloom is not None
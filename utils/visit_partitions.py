@@ -0,0 +1,128 @@
+import re
+from datetime import UTC, date, datetime
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from database.engine import db
+
+PARTITION_RE = re.compile(r'^visit_y(\d{4})m(\d{2})$')
+ARCHIVE_SCHEMA = 'visit_archive'
+
+
+def month_start(d, shift=0):
+    """Первое число месяца, сдвинутого на shift месяцев от даты d"""
+    index = d.year * 12 + (d.month - 1) + shift
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"visit_y{month.year}m{month.month:02d}"
+
+
+def list_partitions(conn):
+    """Месячные секции visit: {первое число месяца: имя таблицы}"""
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'visit'::regclass
+    """)).scalars()
+    partitions = {}
+    for name in rows:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(conn, month):
+    """Создаёт секцию за месяц, не блокируя запись в visit.
+
+    CREATE TABLE ... PARTITION OF берёт ACCESS EXCLUSIVE на родителя, поэтому таблица
+    создаётся отдельно, а затем подключается через ATTACH PARTITION (SHARE UPDATE EXCLUSIVE).
+    CHECK-ограничение с теми же границами избавляет ATTACH от проверочного сканирования."""
+    name = partition_name(month)
+    start, end = month.isoformat(), month_start(month, 1).isoformat()
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} (LIKE visit INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_bounds "
+        f"CHECK (date >= DATE '{start}' AND date < DATE '{end}')"
+    ))
+    conn.execute(text(
+        f"ALTER TABLE visit ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+    conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bounds"))
+
+
+def detach_partition(conn, name, archive):
+    try:
+        # PostgreSQL 14+: отключение без блокировки читателей и писателей
+        conn.execute(text(f"ALTER TABLE visit DETACH PARTITION {name} CONCURRENTLY"))
+    except ProgrammingError:
+        # Старый PostgreSQL не знает CONCURRENTLY — обычный DETACH под lock_timeout
+        conn.execute(text(f"ALTER TABLE visit DETACH PARTITION {name}"))
+    except OperationalError as e:
+        # Прерванный DETACH CONCURRENTLY оставляет секцию в состоянии "detach pending"
+        if 'pending' not in str(e):
+            raise
+        conn.execute(text(f"ALTER TABLE visit DETACH PARTITION {name} FINALIZE"))
+
+    if archive:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+    else:
+        conn.execute(text(f"DROP TABLE {name}"))
+
+
+def maintain_visit_partitions(months_ahead=None, retention_months=None, archive=None):
+    """Создаёт секции на ближайшие месяцы и убирает секции старше срока хранения.
+
+    Безопасно запускать под нагрузкой: каждый шаг в своей транзакции с lock_timeout,
+    шаг, не дождавшийся блокировки, просто повторится при следующем запуске.
+    Возвращает {'created': [...], 'removed': [...], 'skipped': [...]}."""
+    config = current_app.config
+    if months_ahead is None:
+        months_ahead = int(config.get('VISIT_PARTITIONS_AHEAD', 3))
+    if retention_months is None:
+        retention_months = int(config.get('VISIT_RETENTION_MONTHS', 13))
+    if archive is None:
+        archive = bool(config.get('VISIT_ARCHIVE_OLD_PARTITIONS', False))
+
+    report = {'created': [], 'removed': [], 'skipped': []}
+    if db.engine.dialect.name != 'postgresql':
+        return report
+
+    this_month = month_start(datetime.now(UTC).date())
+    oldest_kept = month_start(this_month, -retention_months)
+
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text("SET lock_timeout = '3s'"))
+        existing = list_partitions(conn)
+
+        for shift in range(months_ahead + 1):
+            month = month_start(this_month, shift)
+            if month in existing:
+                continue
+            name = partition_name(month)
+            try:
+                create_partition(conn, month)
+                report['created'].append(name)
+            except OperationalError as e:
+                current_app.logger.warning(f"Секция {name} не создана, повторим позже: {e}")
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                report['skipped'].append(name)
+
+        if retention_months > 0:
+            for month, name in sorted(existing.items()):
+                if month >= oldest_kept:
+                    break
+                try:
+                    detach_partition(conn, name, archive)
+                    report['removed'].append(name)
+                except OperationalError as e:
+                    current_app.logger.warning(f"Секция {name} не отключена, повторим позже: {e}")
+                    report['skipped'].append(name)
+
+    return report
@@ -0,0 +1,72 @@
+import re
+import threading
+from collections import Counter
+
+DEFAULT_BOT_PATTERN = (
+    r'bot|crawl|spider|slurp|archiver|curl|wget|python-requests|httpx|aiohttp|go-http-client|'
+    r'java/|okhttp|headless|lighthouse|pingdom|uptime|monitor|facebookexternalhit|preview'
+)
+
+# Категории, по которым считаются запросы (tracked — реальный просмотр страницы)
+CATEGORIES = ('tracked', 'method', 'not_found', 'static', 'denied', 'not_allowed', 'ajax', 'bot')
+
+
+class VisitPolicy:
+    """Решает, считать ли запрос визитом, и ведёт счётчики пропущенного трафика.
+
+    Списки VISIT_TRACK_ALLOW / VISIT_TRACK_DENY содержат имена эндпоинтов
+    ('index.about') или блюпринтов ('mobile'). Пустой allow-список разрешает всё,
+    что не запрещено."""
+
+    def __init__(self):
+        self.allow = set()
+        self.deny = {'static', 'mobile', 'health'}
+        self.skip_methods = {'HEAD', 'OPTIONS'}
+        self.bot_re = re.compile(DEFAULT_BOT_PATTERN, re.IGNORECASE)
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.allow = set(app.config.get('VISIT_TRACK_ALLOW', self.allow))
+        self.deny = set(app.config.get('VISIT_TRACK_DENY', self.deny))
+        self.skip_methods = {m.upper() for m in app.config.get('VISIT_TRACK_SKIP_METHODS', self.skip_methods)}
+        self.bot_re = re.compile(app.config.get('VISIT_BOT_PATTERN', DEFAULT_BOT_PATTERN), re.IGNORECASE)
+        app.extensions['visit_policy'] = self
+
+    def classify(self, request):
+        if request.method in self.skip_methods:
+            return 'method'
+
+        endpoint = request.endpoint
+        if endpoint is None:
+            return 'not_found'
+        if endpoint == 'static':
+            return 'static'
+
+        blueprint = request.blueprint
+        if endpoint in self.deny or (blueprint and blueprint in self.deny):
+            return 'denied'
+        if self.allow and endpoint not in self.allow and blueprint not in self.allow:
+            return 'not_allowed'
+
+        # Просмотр страницы — только обычный GET, не AJAX и не отправка форм
+        if request.method != 'GET' or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return 'ajax'
+
+        user_agent = request.headers.get('User-Agent', '')
+        if not user_agent or self.bot_re.search(user_agent):
+            return 'bot'
+        return 'tracked'
+
+    def should_track(self, request):
+        category = self.classify(request)
+        with self._lock:
+            self._counters[category] += 1
+        return category == 'tracked'
+
+    def counters(self):
+        with self._lock:
+            return {category: self._counters.get(category, 0) for category in CATEGORIES}
+
+
+visit_policy = VisitPolicy()
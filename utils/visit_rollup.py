@@ -0,0 +1,99 @@
+from collections import defaultdict
+
+from sqlalchemy import case, func, select, update
+
+from database.dialect import insert
+from database.engine import db
+from database.models.visit import Visit
+from database.models.visit_rollup import VisitDailyRollup
+from utils.hyperloglog import HyperLogLog
+
+
+def add_to_rollup(inserted_rows):
+    """Прибавляет к дневным счётчикам реально вставленные визиты (строки с user_id и date).
+    Вызывается в той же транзакции, что и INSERT визитов."""
+    per_day = defaultdict(lambda: {'guests': 0, 'users': 0})
+    for row in inserted_rows:
+        per_day[row.date]['users' if row.user_id is not None else 'guests'] += 1
+    if not per_day:
+        return
+
+    values = [
+        {'date': day, 'guests': c['guests'], 'users': c['users'], 'total': c['guests'] + c['users']}
+        for day, c in per_day.items()
+    ]
+    table = VisitDailyRollup.__table__
+    stmt = insert(table).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.date],
+        set_={
+            'guests': table.c.guests + stmt.excluded.guests,
+            'users': table.c.users + stmt.excluded.users,
+            'total': table.c.total + stmt.excluded.total,
+        },
+    )
+    db.session.execute(stmt)
+
+
+def save_sketches(sketches):
+    """Сливает оценки уникальных посетителей {день: HyperLogLog} с сохранёнными в БД
+    (поразрядный максимум регистров). Вызывается в той же транзакции, что и INSERT визитов."""
+    if not sketches:
+        return
+    table = VisitDailyRollup.__table__
+    days = sorted(sketches)
+    db.session.execute(
+        insert(table).values([{'date': day, 'guests': 0, 'users': 0, 'total': 0} for day in days])
+        .on_conflict_do_nothing()
+    )
+    # Строки дней блокируются до коммита: другой процесс дождётся и сольёт свои регистры поверх наших
+    stored = dict(db.session.execute(
+        select(table.c.date, table.c.sketch).where(table.c.date.in_(days)).order_by(table.c.date).with_for_update()
+    ).all())
+    for day in days:
+        sketch = sketches[day]
+        saved = stored.get(day)
+        if saved is not None and len(saved) == sketch.m:
+            sketch = HyperLogLog.from_registers(saved).merge(sketch)
+        db.session.execute(update(table).where(table.c.date == day).values(sketch=bytes(sketch.registers)))
+
+
+def load_sketch(start, end, p=14):
+    """Объединённая оценка уникальных посетителей за период [start, end] по всем процессам"""
+    total = HyperLogLog(p)
+    stored = db.session.execute(
+        select(VisitDailyRollup.sketch)
+        .where(VisitDailyRollup.date >= start, VisitDailyRollup.date <= end, VisitDailyRollup.sketch.isnot(None))
+    ).scalars()
+    for data in stored:
+        if len(data) == total.m:
+            total.merge(HyperLogLog.from_registers(data))
+    return total
+
+
+def rebuild_rollup(since=None):
+    """Пересчитывает счётчики из таблицы visit (начиная с даты since или целиком).
+    Нужен для первичного заполнения и для починки после ручных правок в visit.
+    Оценки уникальных посетителей (sketch) из visit не восстановить — они сохраняются."""
+    reset = update(VisitDailyRollup).values(guests=0, users=0, total=0)
+    source = db.select(
+        Visit.date,
+        func.sum(case((Visit.user_id.is_(None), 1), else_=0)),
+        func.sum(case((Visit.user_id.isnot(None), 1), else_=0)),
+        func.count(),
+    ).where(Visit.date.isnot(None))
+    if since is not None:
+        reset = reset.where(VisitDailyRollup.date >= since)
+        source = source.where(Visit.date >= since)
+    source = source.group_by(Visit.date)
+
+    db.session.execute(reset.execution_options(synchronize_session=False))
+    table = VisitDailyRollup.__table__
+    stmt = insert(table).from_select(['date', 'guests', 'users', 'total'], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.date],
+        set_={'guests': stmt.excluded.guests, 'users': stmt.excluded.users, 'total': stmt.excluded.total},
+    )
+    result = db.session.execute(stmt)
+    db.session.commit()
+    return result.rowcount
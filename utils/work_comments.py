@@ -0,0 +1,50 @@
+from flask import current_app
+from sqlalchemy import func, select
+
+from database.engine import db
+from database.models.work_comment import WorkComment
+
+WORK_ORDER = 'work_order'
+
+
+def add_comment(entity_id, body, author=None, entity_type=WORK_ORDER):
+    """Добавляет комментарий одной вставкой в work_comments. Коммит — за вызывающим."""
+    comment = WorkComment(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        author_id=author.id if author is not None else None,
+        body=body,
+    )
+    db.session.add(comment)
+    return comment
+
+
+def latest_comments(entity_ids, limit=None, entity_type=WORK_ORDER):
+    """Последние limit комментариев для каждой строки страницы — одним запросом.
+
+    Возвращает {entity_id: [комментарии, новые сверху]}; строк без комментариев в словаре нет."""
+    if limit is None:
+        limit = int(current_app.config.get('COMMENTS_PER_ROW', 3))
+    entity_ids = list(entity_ids)
+    if not entity_ids or limit <= 0:
+        return {}
+
+    newest_first = (WorkComment.created_at.desc(), WorkComment.id.desc())
+    ranked = (
+        select(WorkComment.id, func.row_number().over(
+            partition_by=WorkComment.entity_id, order_by=newest_first,
+        ).label('rank'))
+        .where(WorkComment.entity_type == entity_type, WorkComment.entity_id.in_(entity_ids))
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(WorkComment)
+        .join(ranked, ranked.c.id == WorkComment.id)
+        .where(ranked.c.rank <= limit)
+        .order_by(WorkComment.entity_id, *newest_first)
+    ).scalars()
+
+    comments = {}
+    for comment in rows:
+        comments.setdefault(comment.entity_id, []).append(comment)
+    return comments
@@ -0,0 +1,136 @@
+from sqlalchemy import delete, select, update
+
+from database.engine import db
+from database.models.work_comment import WorkComment
+from database.models.work_order import (
+    CANCELLED,
+    COMPLETED,
+    IN_SERVICE,
+    NEW,
+    QUEUED,
+    WorkOrder,
+)
+from utils.utc import utcnow
+from utils.work_comments import WORK_ORDER
+
+# Разрешённые переходы: этап -> (из каких этапов, колонка времени перехода)
+TRANSITIONS = {
+    QUEUED: ((NEW,), 'queued_at'),
+    IN_SERVICE: ((QUEUED,), 'service_started_at'),
+    COMPLETED: ((IN_SERVICE,), 'completed_at'),
+    CANCELLED: ((NEW, QUEUED, IN_SERVICE), 'cancelled_at'),
+}
+
+
+# Удалить насовсем можно только заявку, которая не дошла до работы; остальные заказы — история, их отменяют
+DELETABLE = (NEW, CANCELLED)
+
+# Сколько id можно передать в одно массовое действие
+MAX_BULK_IDS = 500
+
+
+class TransitionError(Exception):
+    pass
+
+
+def transition(ids, to_status, from_statuses=None, **values):
+    """Переводит заказы в этап to_status одним UPDATE ... WHERE status IN (...) RETURNING id.
+
+    ids — id или список id; values — поля, которые меняются вместе с этапом.
+    from_statuses сужает допустимые исходные этапы (например, отмена только из ремонта).
+    Заказы не в том этапе (уже переведённые другим админом и т.п.) не трогаются.
+    Возвращает множество id, которые действительно перешли. Коммит — за вызывающим."""
+    if to_status not in TRANSITIONS:
+        raise TransitionError(f"Нельзя перевести заказ в статус {to_status}")
+    allowed, timestamp = TRANSITIONS[to_status]
+    if from_statuses is not None:
+        allowed = tuple(status for status in allowed if status in from_statuses)
+    if isinstance(ids, int):
+        ids = [ids]
+
+    stmt = (
+        update(WorkOrder)
+        .where(WorkOrder.id.in_(ids), WorkOrder.status.in_(allowed))
+        .values(status=to_status, **{timestamp: utcnow()}, **values)
+        .returning(WorkOrder.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(db.session.execute(stmt).scalars())
+
+
+def parse_ids(payload):
+    """Список id из тела массового действия ({"ids": [1, 2, ...]}) без повторов, в исходном порядке.
+
+    Бросает ValueError, если id нет, их слишком много или среди них не целые числа."""
+    raw = (payload or {}).get('ids')
+    if not isinstance(raw, list) or not raw:
+        raise ValueError('Не переданы id записей')
+    if len(raw) > MAX_BULK_IDS:
+        raise ValueError(f'За один раз можно обработать не больше {MAX_BULK_IDS} записей')
+    ids = []
+    for value in raw:
+        if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+            raise ValueError(f'Неверный id: {value!r}')
+        if int(value) not in ids:
+            ids.append(int(value))
+    return ids
+
+
+def bulk_results(ids, done, status):
+    """Результат массового действия по каждому id.
+
+    done — id, к которым действие применилось; для остальных одним запросом
+    выясняется, почему: записи нет или она уже в другом статусе."""
+    rest = [order_id for order_id in ids if order_id not in done]
+    current = {}
+    if rest:
+        current = dict(db.session.execute(
+            select(WorkOrder.id, WorkOrder.status).where(WorkOrder.id.in_(rest))
+        ).all())
+
+    results = []
+    for order_id in ids:
+        if order_id in done:
+            results.append({'id': order_id, 'ok': True, 'status': status})
+        elif order_id in current:
+            results.append({'id': order_id, 'ok': False, 'error': 'wrong_status', 'status': current[order_id]})
+        else:
+            results.append({'id': order_id, 'ok': False, 'error': 'not_found'})
+    return results
+
+
+def excel_files(ids, statuses):
+    """{id: путь сметы в хранилище} заказов в статусах statuses; строки блокируются до конца транзакции,
+    чтобы файл не сменился между чтением и переходом"""
+    return dict(db.session.execute(
+        select(WorkOrder.id, WorkOrder.excel_file)
+        .where(WorkOrder.id.in_(ids), WorkOrder.status.in_(statuses), WorkOrder.excel_file.isnot(None))
+        .with_for_update()
+    ).all())
+
+
+def excel_download_name(path):
+    """Имя, под которым смету загрузили (для скачивания); None — файл ни к одному заказу не привязан"""
+    return db.session.execute(
+        select(WorkOrder.excel_name).where(WorkOrder.excel_file == path).limit(1)
+    ).scalar()
+
+
+def delete_orders(ids):
+    """Удаляет новые и отменённые заказы (DELETABLE) вместе с их комментариями: по одному DELETE на таблицу.
+    Заказы в очереди, ремонте и выполненные не трогаются — bulk_results() покажет их как wrong_status.
+
+    Возвращает {id удалённого заказа: путь сметы в хранилище или None}. Коммит — за вызывающим."""
+    deleted = dict(db.session.execute(
+        delete(WorkOrder)
+        .where(WorkOrder.id.in_(ids), WorkOrder.status.in_(DELETABLE))
+        .returning(WorkOrder.id, WorkOrder.excel_file)
+        .execution_options(synchronize_session=False)
+    ).all())
+    if deleted:
+        db.session.execute(
+            delete(WorkComment)
+            .where(WorkComment.entity_type == WORK_ORDER, WorkComment.entity_id.in_(list(deleted)))
+            .execution_options(synchronize_session=False)
+        )
+    return deleted
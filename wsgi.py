@@ -0,0 +1,7 @@
+# wsgi.py — точка входа для WSGI-сервера: gunicorn -c gunicorn.conf.py wsgi:app
+
+from app import create_app, load_blueprints
+
+# Под веб-сервером команды миграций не нужны — alembic не загружаем
+app = create_app({'MIGRATIONS_ENABLED': False})
+load_blueprints(app)